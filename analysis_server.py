@@ -0,0 +1,255 @@
+#!/usr/bin/env python3
+
+import argparse
+import copy
+import io
+import json
+import threading
+from concurrent.futures import Future
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from content_gap_analyzer import ContentGapAnalyzer, canonical_domain, canonical_domains
+from config import Config
+
+
+class AnalysisService:
+    """Long-running analysis service that keeps the analyzer, its HTTP session and domain cache warm"""
+
+    def __init__(self, analyzer=None):
+        self.analyzer = analyzer or ContentGapAnalyzer()
+        self._lock = threading.Lock()
+        self._inflight = {}
+
+    def get_settings(self):
+        """Return the current saved settings"""
+        return {
+            'target_domain': self.analyzer.target_domain,
+            'competitors': list(self.analyzer.competitors),
+            'treatment_keywords': list(self.analyzer.treatment_keywords),
+            'treatment_categories': [
+                {'id': str(i), 'name': name, 'keywords': list(keywords)}
+                for i, (name, keywords) in enumerate(self.analyzer.treatment_categories.items(), 1)
+            ],
+            'filter_keywords': self.analyzer.filter_keywords,
+            'keyword_expansion': self.analyzer.keyword_expansion
+        }
+
+    def update_settings(self, payload):
+        """Apply and persist settings from a request payload"""
+        with self._lock:
+            self._apply_payload(self.analyzer, payload)
+            self.analyzer.save_current_settings()
+        return self.get_settings()
+
+    def analyze(self, payload=None):
+        """Run an analysis, sharing one in-flight run between identical concurrent requests"""
+        analyzer = self._make_analyzer(payload or {})
+        key = self._analysis_key(analyzer)
+
+        with self._lock:
+            future = self._inflight.get(key)
+            is_owner = future is None
+            if is_owner:
+                future = Future()
+                self._inflight[key] = future
+
+        if not is_owner:
+            return future.result()
+
+        try:
+            results = analyzer.analyze_content_gap()
+            future.set_result(results)
+            return results
+        except Exception as e:
+            future.set_exception(e)
+            raise
+        finally:
+            with self._lock:
+                self._inflight.pop(key, None)
+
+    def _analysis_key(self, analyzer):
+        """Every setting that changes the results, so only truly identical requests share a run"""
+        return (
+            analyzer.target_domain,
+            tuple(sorted(analyzer.competitors)),
+            analyzer.filter_keywords,
+            tuple(sorted(analyzer.treatment_keywords)),
+            analyzer._categories_key(),
+            analyzer.keyword_expansion
+        )
+
+    def analyze_json(self, payload=None):
+        """Run an analysis and return the JSON shape used by the web UI"""
+        results = self.analyze(payload)
+        return {
+            'target_keywords': self._keyword_rows(results['target_keywords']),
+            'competitor_data': {
+                competitor: self._keyword_rows(data)
+                for competitor, data in results['competitor_data'].items()
+            },
+            'content_gaps': {
+                competitor: [self.analyzer.score_gap(gap) for gap in gap_keywords]
+                for competitor, gap_keywords in results['content_gaps'].items()
+            },
+            'run_report': results.get('run_report'),
+            'target_missing': results.get('target_missing', False)
+        }
+
+    def pages(self, payload=None):
+        """Run an analysis and return the ranked competitor pages to build"""
+        results = self.analyze(payload)
+        pages_df = self.analyzer.page_opportunities(results)
+        # NaN is not valid JSON, so missing ranks are sent as null
+        pages_df = pages_df.astype(object).where(pages_df.notna(), None)
+        return {'pages': pages_df.to_dict(orient='records')}
+
+    def export(self, payload=None):
+        """Run an analysis and return the Excel workbook as bytes"""
+        results = self.analyze(payload)
+        buffer = io.BytesIO()
+        if not self.analyzer.export_to_excel(results, buffer):
+            raise ValueError("No data for the target domain, nothing to export")
+        return buffer.getvalue()
+
+    def _make_analyzer(self, payload):
+        """Create a per-request analyzer that shares the warm client and domain cache"""
+        analyzer = copy.copy(self.analyzer)
+        analyzer.competitors = list(self.analyzer.competitors)
+        analyzer.treatment_keywords = list(self.analyzer.treatment_keywords)
+        self._apply_payload(analyzer, payload)
+        return analyzer
+
+    def _apply_payload(self, analyzer, payload):
+        """Copy recognised settings fields from a request payload onto an analyzer"""
+        if canonical_domain(payload.get('target_domain')):
+            analyzer.target_domain = canonical_domain(payload['target_domain'])
+        if payload.get('competitors') is not None:
+            analyzer.competitors = canonical_domains(payload['competitors'])
+        if payload.get('treatment_categories') is not None:
+            analyzer.treatment_categories = {
+                category['name']: list(category.get('keywords', []))
+                for category in payload['treatment_categories']
+            }
+            analyzer.treatment_keywords = [
+                kw for keywords in analyzer.treatment_categories.values() for kw in keywords
+            ]
+        if payload.get('treatment_keywords') is not None:
+            analyzer.treatment_keywords = list(payload['treatment_keywords'])
+        if payload.get('filter_keywords') is not None:
+            analyzer.filter_keywords = bool(payload['filter_keywords'])
+        if 'keyword_expansion' in payload:
+            analyzer.keyword_expansion = payload['keyword_expansion'] or None
+
+    def _keyword_rows(self, keyword_data):
+        """Reduce raw keyword items to keyword, search volume and rank"""
+        rows = []
+        for item in keyword_data or []:
+            for kw_item in (item or {}).get('items') or []:
+                if not kw_item:
+                    continue
+                kw_data = kw_item.get('keyword_data', {})
+                rows.append({
+                    'keyword': kw_data.get('keyword', ''),
+                    'search_volume': kw_data.get('keyword_info', {}).get('search_volume'),
+                    'rank': kw_item.get('ranked_serp_element', {}).get('serp_item', {}).get('rank_absolute')
+                })
+        return rows
+
+
+class AnalysisRequestHandler(BaseHTTPRequestHandler):
+    """Local API for server-side callers; it sends no CORS headers, so browser pages cannot call it"""
+    service = None
+
+    def do_GET(self):
+        if self.path == '/api/settings':
+            self._send_json(self.service.get_settings())
+        elif self.path == '/health':
+            self._send_json({'status': 'ok'})
+        else:
+            self._send_json({'error': 'Not found'}, status=404)
+
+    def do_POST(self):
+        # A JSON content type forces a CORS preflight, which this service never answers, so a web page
+        # cannot trigger paid runs or settings changes with a "simple" cross-site form or text/plain POST
+        content_type = (self.headers.get('Content-Type') or '').split(';')[0].strip().lower()
+        if content_type != 'application/json':
+            self._send_json({'error': 'Content-Type must be application/json'}, status=415)
+            return
+
+        try:
+            payload = self._read_json()
+        except ValueError:
+            self._send_json({'error': 'Invalid JSON body'}, status=400)
+            return
+
+        try:
+            if self.path == '/api/analyze':
+                self._send_json(self.service.analyze_json(payload))
+            elif self.path == '/api/pages':
+                self._send_json(self.service.pages(payload))
+            elif self.path == '/api/export':
+                self._send_bytes(
+                    self.service.export(payload),
+                    'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
+                    'content_gap_analysis.xlsx'
+                )
+            elif self.path == '/api/settings':
+                self._send_json(self.service.update_settings(payload))
+            else:
+                self._send_json({'error': 'Not found'}, status=404)
+        except Exception as e:
+            print(f"Fejl under behandling af {self.path}: {e}")
+            self._send_json({'error': str(e)}, status=500)
+
+    def _read_json(self):
+        length = int(self.headers.get('Content-Length') or 0)
+        if not length:
+            return {}
+        payload = json.loads(self.rfile.read(length).decode('utf-8'))
+        if not isinstance(payload, dict):
+            raise ValueError("Payload must be a JSON object")
+        return payload
+
+    def _send_json(self, data, status=200):
+        body = json.dumps(data, ensure_ascii=False).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _send_bytes(self, body, content_type, filename):
+        self.send_response(200)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Disposition', f'attachment; filename="{filename}"')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+def run_server(host=Config.SERVICE_HOST, port=Config.SERVICE_PORT, service=None):
+    """Start the analysis service and block until interrupted"""
+    handler = type('BoundAnalysisRequestHandler', (AnalysisRequestHandler,), {
+        'service': service or AnalysisService()
+    })
+    server = ThreadingHTTPServer((host, port), handler)
+    print(f"Analyse service kører på http://{host}:{port}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        print("\nStopper analyse service")
+    finally:
+        server.server_close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run the content gap analysis service")
+    parser.add_argument('--host', default=Config.SERVICE_HOST)
+    parser.add_argument('--port', type=int, default=Config.SERVICE_PORT)
+    args = parser.parse_args()
+
+    run_server(args.host, args.port)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,164 @@
+#!/usr/bin/env python3
+
+import argparse
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from content_gap_analyzer import ContentGapAnalyzer, canonical_domain
+from config import Config
+
+class CompetitorDiscovery:
+    """Finds competitor candidates for the target and ranks them by treatment keyword overlap"""
+
+    def __init__(self, analyzer=None, fetch_limit=Config.DISCOVERY_FETCH_LIMIT):
+        self.analyzer = analyzer or ContentGapAnalyzer()
+        self.fetch_limit = fetch_limit
+
+    def get_candidates(self):
+        """Candidate domains from competitors_domain, most shared keywords and traffic first"""
+        target = self.analyzer.target_domain
+        try:
+            response = self.analyzer.client.get_competitors_keywords(
+                target, limit=Config.DISCOVERY_CANDIDATE_LIMIT,
+                location_code=self.analyzer.location_code, language_code=self.analyzer.language_code
+            )
+        except Exception as e:
+            print(f"Exception getting competitors for {target}: {e}")
+            return []
+
+        if response.get('status_code') != 20000:
+            print(f"Error getting competitors for {target}: {response.get('status_message')}")
+            return []
+
+        excluded = {target, *self.analyzer.competitors}
+        candidates = {}
+        for task in response.get('tasks') or []:
+            for result in task.get('result') or []:
+                for item in result.get('items') or []:
+                    domain = canonical_domain((item or {}).get('domain'))
+                    if domain and domain not in excluded and domain not in candidates:
+                        organic = ((item.get('full_domain_metrics') or item.get('metrics') or {}).get('organic') or {})
+                        candidates[domain] = (item.get('intersections') or 0, organic.get('etv') or 0)
+        return sorted(candidates, key=candidates.get, reverse=True)
+
+    def rank_candidates(self, candidates, run_id=None):
+        """Fetch the top candidates within the budget and rank them by shared treatment keywords"""
+        run_id = run_id or self.analyzer.client.new_run()
+        client = self.analyzer.client
+        with client.cost_run(run_id):
+            target_set = self.analyzer._treatment_keyword_set(
+                self.analyzer._get_raw_domain_keywords(self.analyzer.target_domain)
+            )
+
+        to_fetch = self._within_budget(candidates[:self.fetch_limit], run_id)
+
+        def fetch(domain):
+            with client.cost_run(run_id):
+                return self._candidate_keywords(domain)
+
+        with ThreadPoolExecutor(max_workers=Config.MAX_CONCURRENT_REQUESTS) as executor:
+            candidate_data = dict(zip(to_fetch, executor.map(fetch, to_fetch)))
+
+        ranked = []
+        for domain, raw_data in candidate_data.items():
+            candidate_set = self.analyzer._treatment_keyword_set(raw_data)
+            overlap = len(target_set & candidate_set)
+            union = len(target_set | candidate_set)
+            ranked.append({
+                'domain': domain,
+                'overlap': overlap,
+                'jaccard': round(overlap / union, 3) if union else 0.0,
+                'treatment_keywords': len(candidate_set)
+            })
+
+        ranked.sort(key=lambda row: (row['overlap'], row['jaccard']), reverse=True)
+        return ranked
+
+    def _within_budget(self, candidates, run_id):
+        """The leading candidates whose estimated fetch cost still fits in the analyzer's budget"""
+        budget = self.analyzer.budget
+        if budget is None:
+            return candidates
+        planned = sum(entry['cost'] for entry in self.analyzer.client.cost_entries(run_id))
+        for i, domain in enumerate(candidates):
+            planned += self.analyzer._estimate_domain(domain)['cost']
+            if planned > budget:
+                print(f"  Budget på ${budget:.4f} rækker til {i} af {len(candidates)} kandidater")
+                return candidates[:i]
+        return candidates
+
+    def _candidate_keywords(self, domain):
+        """Candidate data is cached in memory only, so rejected candidates leave no stored files"""
+        cached = self.analyzer.raw_cache.get(domain)
+        if self.analyzer.offline or (cached and time.time() - cached[0] < Config.DOMAIN_CACHE_TTL):
+            return self.analyzer._get_raw_domain_keywords(domain)
+        try:
+            raw_data = self.analyzer._fetch_domain_pages(domain)
+        except Exception as e:
+            print(f"Exception getting keywords for {domain}: {e}")
+            return []
+        if raw_data:
+            self.analyzer.raw_cache[domain] = (time.time(), raw_data)
+        return raw_data or []
+
+    def estimate(self):
+        """Dry run: estimated calls and cost of discover() without calling the API"""
+        candidate_cost = Config.COST_PER_REQUEST + Config.DISCOVERY_CANDIDATE_LIMIT * Config.COST_PER_ITEM
+        target = self.analyzer._estimate_domain(self.analyzer.target_domain)
+        # Candidates are unknown until competitors_domain answers, so price each as a full uncached fetch
+        pages = Config.RANKED_KEYWORDS_MAX_PAGES
+        per_candidate = pages * Config.COST_PER_REQUEST + pages * Config.RANKED_KEYWORDS_LIMIT * Config.COST_PER_ITEM
+        calls = 1 + target['calls'] + self.fetch_limit * pages
+        cost = round(candidate_cost + target['cost'] + self.fetch_limit * per_candidate, 4)
+        print(f"Estimat: {calls} kald, ${cost:.4f} (op til {self.fetch_limit} kandidater hentes)")
+        return {'calls': calls, 'cost': cost, 'budget': self.analyzer.budget}
+
+    def discover(self, top_n=10):
+        """Return the top N ranked competitor candidates"""
+        print(f"Finder konkurrenter for {self.analyzer.target_domain}")
+        run_id = self.analyzer.client.new_run()
+        with self.analyzer.client.cost_run(run_id):
+            candidates = self.get_candidates()
+        print(f"  {len(candidates)} kandidater fundet, henter data for op til {self.fetch_limit}")
+        ranked = self.rank_candidates(candidates, run_id)[:top_n]
+        total_cost = sum(entry['cost'] for entry in self.analyzer.client.cost_entries(run_id))
+        print(f"  API forbrug: ${total_cost:.4f}")
+        return ranked
+
+    def print_ranking(self, ranked):
+        """Print a ranked candidate list"""
+        for i, row in enumerate(ranked, 1):
+            print(f"{i}. {row['domain']} - {row['overlap']} fælles keywords "
+                  f"(jaccard {row['jaccard']}, {row['treatment_keywords']} behandlings-keywords)")
+
+    def apply(self, ranked):
+        """Add the ranked candidates to the saved competitor list"""
+        new_domains = [row['domain'] for row in ranked if row['domain'] not in self.analyzer.competitors]
+        self.analyzer.set_competitors(self.analyzer.competitors + new_domains)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Discover competitors by treatment keyword overlap")
+    parser.add_argument('--top', type=int, default=10, help="Number of candidates to show")
+    parser.add_argument('--apply', action='store_true', help="Add the top candidates to the competitor list")
+    parser.add_argument('--fetch-limit', type=int, default=Config.DISCOVERY_FETCH_LIMIT,
+                        help="Number of candidates whose keywords are fetched and compared")
+    parser.add_argument('--budget', type=float, help="Maximum USD spend for the discovery")
+    parser.add_argument('--dry-run', action='store_true', help="Only estimate the API calls and cost")
+    args = parser.parse_args()
+
+    discovery = CompetitorDiscovery(fetch_limit=args.fetch_limit)
+    if args.budget is not None:
+        discovery.analyzer.budget = args.budget
+    if args.dry_run:
+        discovery.estimate()
+        return
+    ranked = discovery.discover(args.top)
+    discovery.print_ranking(ranked)
+
+    if args.apply and ranked:
+        discovery.apply(ranked)
+
+
+if __name__ == "__main__":
+    main()
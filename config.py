@@ -15,6 +15,65 @@ class Config:
     LOCATION_CODE = 2208  # Denmark
     LANGUAGE_CODE = 'da'  # Danish
     
+    # ranked_keywords pagination: items per call, max calls per domain and one order for every fetch,
+    # so capped fetches keep the highest volume keywords and a preview slice is always the first page
+    RANKED_KEYWORDS_LIMIT = 1000
+    RANKED_KEYWORDS_MAX_PAGES = 1
+    RANKED_KEYWORDS_ORDER_BY = ['keyword_data.keyword_info.search_volume,desc']
+    
+    # Preview mode: small first slice per domain that the full fetch continues from while it is fresh
+    PREVIEW_LIMIT = 100
+    PREVIEW_PAGE_TTL = 600  # seconds
+    
+    # DataForSEO Labs pricing used for dry-run estimates (USD)
+    COST_PER_REQUEST = 0.01
+    COST_PER_ITEM = 0.0001
+    COST_LOG_MAX_ENTRIES = 10000
+    RUN_BUDGET = float(os.getenv('RUN_BUDGET')) if os.getenv('RUN_BUDGET') else None
+    
+    # API rate limits shared by all requests from one client
+    MAX_CONCURRENT_REQUESTS = 8
+    MAX_REQUESTS_PER_MINUTE = 600
+    
+    # Analysis service settings
+    SERVICE_HOST = os.getenv('ANALYSIS_SERVICE_HOST', '127.0.0.1')
+    SERVICE_PORT = int(os.getenv('ANALYSIS_SERVICE_PORT', '8765'))
+    DOMAIN_CACHE_TTL = int(os.getenv('DOMAIN_CACHE_TTL', '21600'))  # seconds (6 hours)
+    REQUEST_MEMO_TTL = 600  # seconds identical API payloads reuse one parsed response
+    REQUEST_MEMO_MAX_ENTRIES = 500  # memoized responses kept at most, oldest evicted first
+    
+    # Unfiltered per-domain data from the last fetch, used for offline re-analysis
+    RAW_DATA_DIR = 'raw_data'
+    
+    # Append-only ranking history written after every run
+    HISTORY_DB = 'history.sqlite'
+    
+    # Watch daemon settings
+    WATCH_REFRESH_INTERVAL = 24 * 3600  # seconds between refreshes of one domain
+    WATCH_JITTER = 0.15  # random spread as a fraction of the interval
+    WATCH_RETRY_DELAY = 30 * 60  # seconds before a failed refresh is retried
+    WATCH_STATE_FILE = 'watch_state.json'
+    WATCH_NOTIFY_FILE = 'watch_notifications.jsonl'
+    
+    # Rows of the gap tables kept in the summary-only Excel workbook (the full tables go to the dataset)
+    SUMMARY_TOP_ROWS = 500
+    
+    # Striking-distance rank gaps: target ranks in this range while a competitor is in the top N
+    STRIKING_DISTANCE_RANKS = (11, 30)
+    RANK_GAP_COMPETITOR_TOP = 3
+    
+    # Entries kept in the memoized keyword normalizer (keywords repeat heavily across domains)
+    KEYWORD_NORMALIZE_CACHE_SIZE = 200000
+    
+    # Competitor discovery settings
+    DISCOVERY_CANDIDATE_LIMIT = 100  # domains requested from competitors_domain
+    DISCOVERY_FETCH_LIMIT = 20  # top candidates whose keywords are fetched and compared
+    
+    # Keyword idea expansion settings
+    KEYWORD_IDEAS_SEED_LIMIT = 200  # max seed keywords per keyword_ideas/live call
+    KEYWORD_IDEAS_LIMIT = 1000  # max ideas returned per keyword_ideas/live call
+    KEYWORD_IDEAS_CACHE_TTL = 7 * 24 * 3600  # seconds before a seed is expanded again
+    
     # Competitor domains for comparison - laser/kosmetiske behandlingsklinikker
     COMPETITOR_DOMAINS = [
         'laserklinik.dk',
@@ -25,27 +84,78 @@ class Config:
         'laserbehandling.dk'
     ]
     
+    # Behandlingskategorier og deres keywords til filtrering og kategori-opsummering
+    TREATMENT_CATEGORIES = {
+        'Permanent hårfjerning': [
+            'permanent hårfjerning', 'hårfjerning', 'laser hårfjerning', 'ipl hårfjerning', 'diode laser',
+            'alexandrite laser', 'epilering', 'hår fjernelse'
+        ],
+        'Botox': ['botox', 'botulinum', 'rynkebehandling', 'panderynker', 'kragerødder', 'sveden'],
+        'Filler': ['filler', 'hyaluronsyre', 'læbefiller', 'kindben', 'næsefiller', 'hageforstørrelse'],
+        'Karsprængninger': [
+            'karsprængninger', 'åreknuder', 'blodsprængninger', 'kapillarer', 'couperose',
+            'rosacea', 'blodkar', 'vaskulære læsioner'
+        ],
+        'Pigmentforandringer': [
+            'pigmentforandringer', 'pigmentpletter', 'aldersletter', 'solskader', 'melasma',
+            'hyperpigmentering', 'misfarvning', 'brune pletter'
+        ],
+        'CO2 laser': [
+            'co2 laser', 'fraktionel laser', 'hudfornyelse', 'laser resurfacing', 'ar behandling',
+            'porereduktion', 'hudstramning', 'laser peeling'
+        ]
+    }
+    
+    # Category used for treatment keywords that are not part of a predefined category
+    CUSTOM_CATEGORY = 'Custom'
+    
     # Relevante behandlingstyper for filtrering
-    TREATMENT_KEYWORDS = [
-        # Permanent hårfjerning
-        'permanent hårfjerning', 'hårfjerning', 'laser hårfjerning', 'ipl hårfjerning', 'diode laser',
-        'alexandrite laser', 'epilering', 'hår fjernelse',
-        
-        # Botox
-        'botox', 'botulinum', 'rynkebehandling', 'panderynker', 'kragerødder', 'sveden',
-        
-        # Filler
-        'filler', 'hyaluronsyre', 'læbefiller', 'kindben', 'næsefiller', 'hageforstørrelse',
-        
-        # Karsprængninger
-        'karsprængninger', 'åreknuder', 'blodsprængninger', 'kapillarer', 'couperose',
-        'rosacea', 'blodkar', 'vaskulære læsioner',
-        
-        # Pigmentforandringer
-        'pigmentforandringer', 'pigmentpletter', 'aldersletter', 'solskader', 'melasma',
-        'hyperpigmentering', 'misfarvning', 'brune pletter',
-        
-        # CO2 laser
-        'co2 laser', 'fraktionel laser', 'hudfornyelse', 'laser resurfacing', 'ar behandling',
-        'porereduktion', 'hudstramning', 'laser peeling'
-    ]
\ No newline at end of file
+    TREATMENT_KEYWORDS = [kw for keywords in TREATMENT_CATEGORIES.values() for kw in keywords]
+    
+    # Number of top gaps listed per category and competitor in the summary sheet
+    CATEGORY_TOP_GAPS = 5
+    
+    # Market profiles for multi-market analysis. A profile without treatment_categories
+    # uses the categories from settings.json; category names are shared across markets
+    # so the cross-market comparison can line them up.
+    DEFAULT_MARKET = 'dk'
+    MARKETS = {
+        'dk': {
+            'name': 'Danmark',
+            'location_code': 2208,
+            'language_code': 'da',
+            'treatment_categories': None
+        },
+        'se': {
+            'name': 'Sverige',
+            'location_code': 2752,
+            'language_code': 'sv',
+            'treatment_categories': {
+                'Permanent hårfjerning': [
+                    'permanent hårborttagning', 'hårborttagning', 'laser hårborttagning', 'ipl hårborttagning',
+                    'diodlaser', 'alexandritlaser'
+                ],
+                'Botox': ['botox', 'botulinum', 'rynkbehandling', 'pannrynkor', 'kråksparkar', 'svettning'],
+                'Filler': ['filler', 'fillers', 'hyaluronsyra', 'läppfiller', 'kindben', 'näsfiller'],
+                'Karsprængninger': ['kärlbristningar', 'åderbråck', 'kapillärer', 'couperos', 'rosacea', 'blodkärl'],
+                'Pigmentforandringer': ['pigmentförändringar', 'pigmentfläckar', 'åldersfläckar', 'solskador', 'melasma'],
+                'CO2 laser': ['co2 laser', 'fraktionerad laser', 'hudföryngring', 'laser resurfacing', 'ärrbehandling']
+            }
+        },
+        'no': {
+            'name': 'Norge',
+            'location_code': 2578,
+            'language_code': 'nb',
+            'treatment_categories': {
+                'Permanent hårfjerning': [
+                    'permanent hårfjerning', 'hårfjerning', 'laser hårfjerning', 'ipl hårfjerning',
+                    'diodelaser', 'alexandritelaser'
+                ],
+                'Botox': ['botox', 'botulinum', 'rynkebehandling', 'pannerynker', 'kråketær', 'svette'],
+                'Filler': ['filler', 'hyaluronsyre', 'leppefiller', 'kinnben', 'nesefiller'],
+                'Karsprængninger': ['karsprengninger', 'åreknuter', 'kapillærer', 'couperose', 'rosacea', 'blodkar'],
+                'Pigmentforandringer': ['pigmentforandringer', 'pigmentflekker', 'aldersflekker', 'solskader', 'melasma'],
+                'CO2 laser': ['co2 laser', 'fraksjonert laser', 'hudfornyelse', 'laser resurfacing', 'arrbehandling']
+            }
+        }
+    }
@@ -0,0 +1,98 @@
+import pytest
+
+from config import Config
+from content_gap_analyzer import ContentGapAnalyzer
+from dataforseo_client import DataForSEOClient
+
+# test_competitors.py is a manual script that edits the real settings.json
+collect_ignore = ['test_competitors.py']
+
+
+def kw_item(keyword, rank, search_volume=100, competition=0.1, cpc=2.0, url=None):
+    """One ranked_keywords item in the API's nested shape"""
+    return {
+        'keyword_data': {
+            'keyword': keyword,
+            'keyword_info': {
+                'search_volume': search_volume,
+                'competition': competition,
+                'competition_level': 'LOW',
+                'cpc': cpc
+            }
+        },
+        'ranked_serp_element': {
+            'serp_item': {
+                'rank_absolute': rank,
+                'url': url or f"https://example.dk/{keyword.replace(' ', '-')}",
+                'title': keyword
+            }
+        }
+    }
+
+
+class FakeClient(DataForSEOClient):
+    """Real client (memo, coalescing, cost log) with the HTTP call replaced by canned ranked_keywords
+    and keyword_ideas data"""
+
+    def __init__(self, data, cost=0.01, ideas=None):
+        super().__init__()
+        self.data = data
+        self.cost = cost
+        self.ideas = ideas or {}
+        self.failing = set()
+        self.sent = []
+        self.idea_batches = []
+
+    def _send_request(self, endpoint, data=None):
+        task = data[0]
+        if 'keyword_ideas' in endpoint:
+            self.idea_batches.append(list(task['keywords']))
+            items = [idea for seed in task['keywords'] for idea in self.ideas.get(seed, [])]
+            return {'status_code': 20000, 'cost': self.cost, 'tasks': [{'result': [{'items': items}]}]}
+        self.sent.append((task.get('target'), task.get('offset', 0), task.get('limit')))
+        if task.get('target') in self.failing:
+            return {'status_code': 40000, 'status_message': 'Fejl', 'cost': 0}
+
+        items = list(self.data.get(task.get('target'), []))
+        if task.get('order_by'):
+            items.sort(key=lambda item: -(item['keyword_data']['keyword_info']['search_volume'] or 0))
+        offset = task.get('offset', 0)
+        page = items[offset:offset + task['limit']]
+        return {
+            'status_code': 20000,
+            'cost': self.cost,
+            'tasks': [{'result': [{'target': task.get('target'), 'total_count': len(items), 'items': page}]}]
+        }
+
+
+DATA = {
+    'cosmolaser.dk': [kw_item('botox pris', 5), kw_item('laser hårfjerning', 15), kw_item('random ting', 3)],
+    'nage.dk': [
+        kw_item('Botox-Pris', 2),
+        kw_item('filler læber', 1, search_volume=600),
+        kw_item('filler  læber', 4, search_volume=50),
+        kw_item('laser haarfjerning', 2),
+        kw_item('åreknuder behandling', 4, url='https://nage.dk/kar')
+    ],
+    'nygart.dk': [kw_item('filler læber', 3, search_volume=600), kw_item('bil', 1)]
+}
+
+
+@pytest.fixture
+def client():
+    return FakeClient({domain: list(items) for domain, items in DATA.items()})
+
+
+@pytest.fixture
+def analyzer(tmp_path, monkeypatch, client):
+    """Analyzer with default settings whose files all live in a temporary directory"""
+    monkeypatch.chdir(tmp_path)
+    analyzer = ContentGapAnalyzer(custom_competitors=['nage.dk', 'nygart.dk'], client=client)
+    analyzer.target_domain = 'cosmolaser.dk'
+    analyzer.treatment_categories = {name: list(keywords) for name, keywords in Config.TREATMENT_CATEGORIES.items()}
+    analyzer.treatment_keywords = list(Config.TREATMENT_KEYWORDS)
+    analyzer.keyword_expansion = None
+    analyzer.budget = None
+    analyzer.record_history = False
+    analyzer.raw_data_dir = str(tmp_path / 'raw_data')
+    return analyzer
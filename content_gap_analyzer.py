@@ -1,16 +1,108 @@
+import numpy as np
 import pandas as pd
+import importlib.util
 import json
+import math
 import os
+import re
+import shutil
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
+from functools import lru_cache
 from dataforseo_client import DataForSEOClient
+from keyword_expansion import KEYWORD_IDEAS_SOURCE, KeywordExpander
+from keyword_normalization import normalize_keyword
+from domain_snapshot import DomainSnapshot, MISSING, write_snapshot
+from history_store import HistoryStore
 from config import Config
 
+
+def canonical_domain(value):
+    """Reduce a URL or domain string to a bare lowercase host without scheme, www, port or path"""
+    domain = (value or '').strip().lower()
+    domain = re.sub(r'^[a-z][a-z0-9+.-]*://', '', domain)
+    domain = re.split(r'[/?#]', domain, maxsplit=1)[0]
+    domain = domain.rsplit('@', 1)[-1].split(':', 1)[0].rstrip('.')
+    if domain.startswith('www.'):
+        domain = domain[4:]
+    return domain
+
+
+def canonical_domains(values):
+    """Canonicalize a list of domains, dropping empty and duplicate entries"""
+    domains = []
+    for value in values:
+        domain = canonical_domain(value)
+        if domain and domain not in domains:
+            domains.append(domain)
+    return domains
+
+
+@lru_cache(maxsize=32)
+def _compile_treatment_pattern(treatment_keywords):
+    """Compile a tuple of treatment keywords into one regex matching inside normalized keywords"""
+    terms = sorted({normalize_keyword(kw) for kw in treatment_keywords} - {''}, key=len, reverse=True)
+    if not terms:
+        return None
+    return re.compile('|'.join(re.escape(term) for term in terms))
+
+
+@lru_cache(maxsize=32)
+def _term_categories(treatment_categories):
+    """Map each normalized treatment term to the categories it belongs to"""
+    term_categories = {}
+    for category, keywords in treatment_categories:
+        for kw in keywords:
+            categories = term_categories.setdefault(normalize_keyword(kw), [])
+            if category not in categories:
+                categories.append(category)
+    return term_categories
+
+
+def _match_categories(keyword, pattern, term_categories):
+    """Categories of the treatment terms found in a keyword, in match order"""
+    if not pattern:
+        return []
+    categories = []
+    for match in pattern.finditer(normalize_keyword(keyword)):
+        for category in term_categories.get(match.group(0), [Config.CUSTOM_CATEGORY]):
+            if category not in categories:
+                categories.append(category)
+    return categories
+
+
 class ContentGapAnalyzer:
-    def __init__(self, custom_competitors=None, filter_keywords=True):
-        self.client = DataForSEOClient()
+    def __init__(self, custom_competitors=None, filter_keywords=True, client=None):
+        self.client = client or DataForSEOClient()
         self.target_domain = Config.TARGET_DOMAIN
         self.settings_file = 'settings.json'
         
+        # Market the analyzer fetches for (None means the default Config market)
+        self.market = None
+        self.location_code = Config.LOCATION_CODE
+        self.language_code = Config.LANGUAGE_CODE
+        
+        # Unfiltered API results per domain: {domain: (fetched_at, raw_data)}
+        self.raw_cache = {}
+        self.raw_data_dir = Config.RAW_DATA_DIR
+        
+        # Preview slices waiting to become the first page of the domain's full fetch
+        self.preview_pages = {}
+        
+        # Memory-mapped snapshots of the stored raw data: {path: (mtime, DomainSnapshot)}
+        self.snapshots = {}
+        
+        # When offline, only stored raw data is used and no API calls are made
+        self.offline = False
+        
+        # Write normalized ranking rows to the history store after each run
+        self.record_history = True
+        
+        # Maximum API spend per run in USD (None means no cap)
+        self.budget = Config.RUN_BUDGET
+        
         # Load saved settings if available
         self._load_settings()
         
@@ -20,50 +112,527 @@ class ContentGapAnalyzer:
         if filter_keywords is not None:
             self.filter_keywords = filter_keywords
         
-    def analyze_content_gap(self):
-        """Main method to perform content gap analysis"""
-        print(f"Analyzing content gap for {self.target_domain}")
+    def analyze_content_gap(self, run_id=None, started_at=None):
+        """Main method to perform content gap analysis (API costs are logged under run_id, a new run if not given;
+        history gets the domains fetched since started_at, the start of this call if not given)"""
+        if run_id is None:
+            run_id = self.client.new_run()
+        with self.client.cost_run(run_id):
+            return self._analyze_content_gap(run_id, started_at or time.time())
+    
+    def _analyze_content_gap(self, run_id, started_at):
+        mode = " (offline fra gemte data)" if self.offline else ""
+        print(f"Analyzing content gap for {self.target_domain}{mode}")
+        skipped = []
         
         # Get target domain keywords
-        target_keywords = self._get_domain_keywords(self.target_domain)
+        target_raw = []
+        if self._within_budget(self.target_domain, run_id, skipped):
+            target_raw = self._get_raw_domain_keywords(self.target_domain)
+        target_keywords = self._filter_domain_keywords(self.target_domain, target_raw)
         
-        # Get competitor keywords
+        # Get competitor keywords, most valuable first so a budget cap drops the least useful ones
         competitor_data = {}
-        for competitor in self.competitors:
-            competitor_data[competitor] = self._get_domain_keywords(competitor)
+        for competitor in self._fetch_order(canonical_domains(self.competitors)):
+            if competitor == canonical_domain(self.target_domain):
+                print(f"  Springer {competitor} over - samme som target domain")
+                continue
+            # Once the cap is reached, only cached domains (which cost nothing) are still used
+            estimate = self._estimate_domain(competitor) if self.budget is not None else None
+            if estimate is None or estimate['cost'] == 0 or (
+                    not skipped and self._within_budget(competitor, run_id, skipped, estimate)):
+                competitor_data[competitor] = self._get_domain_keywords(competitor)
+            elif competitor not in skipped:
+                skipped.append(competitor)
         
-        # Find content gaps
-        gaps = self._find_content_gaps(target_keywords, competitor_data)
+        # Find content gaps (without the target every competitor keyword would look like a gap)
+        target_missing = not target_raw
+        if target_missing and self.target_domain not in skipped:
+            print(f"  {self.target_domain}: ingen data for target domain - ingen gaps beregnet")
+        gaps = {} if target_missing else self._find_content_gaps(target_keywords, competitor_data)
         
-        return {
+        results = {
             'target_keywords': target_keywords,
             'competitor_data': competitor_data,
-            'content_gaps': gaps
+            'content_gaps': gaps,
+            'target_missing': target_missing
+        }
+        
+        # Expand gaps with keyword ideas from seed keywords
+        if self.keyword_expansion and not target_missing:
+            expander = KeywordExpander(self)
+            seeds = expander.select_seeds(results, self.keyword_expansion)
+            if self._within_budget(KEYWORD_IDEAS_SOURCE, run_id, skipped, expander.estimate(seeds)):
+                expander.expand(results, seeds)
+        
+        if self.record_history and not self.offline:
+            self._record_history([self.target_domain, *competitor_data], started_at)
+        
+        results['run_report'] = self._run_report(run_id, skipped)
+        return results
+    
+    def _within_budget(self, domain, run_id, skipped, estimate=None):
+        """Check whether the next fetch fits in what is left of the budget, recording it as skipped if not"""
+        if self.budget is None or self.offline:
+            return True
+        estimate = estimate or self._estimate_domain(domain)
+        spent = sum(entry['cost'] for entry in self.client.cost_entries(run_id))
+        if spent + estimate['cost'] <= self.budget:
+            return True
+        print(f"  Budget på ${self.budget:.4f} nået (brugt ${spent:.4f}) - springer {domain} over")
+        skipped.append(domain)
+        return False
+    
+    def _fetch_order(self, domains):
+        """Under a budget, order domains by the treatment search volume in their stored data"""
+        if self.budget is None or self.offline:
+            return domains
+        
+        # Domains without stored data get the average value
+        values = {}
+        for domain in domains:
+            snapshot = None if domain in self.raw_cache else self.load_snapshot(domain)
+            if snapshot is not None:
+                volumes = snapshot.search_volume[self._snapshot_categories(snapshot)[1]]
+                values[domain] = int(volumes[volumes != MISSING].sum())
+                continue
+            stored = self.raw_cache.get(domain) or self._load_raw_data(domain)
+            if stored:
+                values[domain] = sum(
+                    (kw_item['keyword_data'].get('keyword_info') or {}).get('search_volume') or 0
+                    for item in self._filter_keywords(stored[1])
+                    for kw_item in item.get('items') or []
+                )
+        average = sum(values.values()) / len(values) if values else 0
+        return sorted(domains, key=lambda domain: values.get(domain, average), reverse=True)
+    
+    def _estimate_domain(self, domain):
+        """Estimated calls and cost of fetching a domain, using the stored total_count when there is one"""
+        cached = self.raw_cache.get(domain)
+        if self.offline or (cached and time.time() - cached[0] < Config.DOMAIN_CACHE_TTL):
+            return {'domain': domain, 'calls': 0, 'items': 0, 'cost': 0.0, 'cached': True}
+        
+        limit = Config.RANKED_KEYWORDS_LIMIT
+        max_items = limit * Config.RANKED_KEYWORDS_MAX_PAGES
+        total_count = max_items
+        snapshot = None if cached else self.load_snapshot(domain)
+        if snapshot is not None:
+            total_count = snapshot.total_count or snapshot.rows or max_items
+        else:
+            stored = cached or self._load_raw_data(domain)
+            if stored and stored[1]:
+                total_count = (stored[1][0] or {}).get('total_count') or len((stored[1][0] or {}).get('items') or [])
+        items = min(total_count, max_items)
+        calls = max(1, math.ceil(items / limit))
+        return {
+            'domain': domain,
+            'calls': calls,
+            'items': items,
+            'cost': round(calls * Config.COST_PER_REQUEST + items * Config.COST_PER_ITEM, 4),
+            'cached': False
         }
     
+    def estimate_run(self):
+        """Dry run: estimate the API calls and cost of analyze_content_gap without calling the API"""
+        domains = canonical_domains([self.target_domain, *self.competitors])
+        rows = [self._estimate_domain(domain) for domain in domains]
+        if self.keyword_expansion:
+            expander = KeywordExpander(self)
+            if self.keyword_expansion == 'treatments':
+                expansion = expander.estimate(self.treatment_keywords)
+            else:
+                # Gap seeds are only known after the run, so assume the top 50 are all uncached
+                expansion = expander.batch_cost(0 if self.offline else 50)
+            rows.append(dict(expansion, domain=KEYWORD_IDEAS_SOURCE))
+        
+        estimate = {
+            'rows': rows,
+            'calls': sum(row['calls'] for row in rows),
+            'cost': round(sum(row['cost'] for row in rows), 4),
+            'budget': self.budget
+        }
+        
+        print(f"Estimat for {self.target_domain} ({len(domains) - 1} konkurrenter, "
+              f"max {Config.RANKED_KEYWORDS_MAX_PAGES} sider pr. domæne):")
+        for row in rows:
+            status = "cache" if row['cached'] else f"{row['calls']} kald, ~{row['items']} keywords"
+            print(f"  {row['domain']}: {status} - ${row['cost']:.4f}")
+        print(f"I alt: {estimate['calls']} kald, ${estimate['cost']:.4f}")
+        if self.budget is not None and estimate['cost'] > self.budget:
+            print(f"Overstiger budgettet på ${self.budget:.4f} - de mindst værdifulde domæner springes over")
+        return estimate
+    
+    def _run_report(self, run_id, skipped):
+        """Cost per request, domain and endpoint for this market's requests in a run"""
+        entries = [
+            entry for entry in self.client.cost_entries(run_id)
+            if entry['location_code'] in (None, self.location_code)
+        ]
+        by_domain = {}
+        by_endpoint = {}
+        for entry in entries:
+            by_domain[entry['domain']] = round(by_domain.get(entry['domain'], 0) + entry['cost'], 6)
+            by_endpoint[entry['endpoint']] = round(by_endpoint.get(entry['endpoint'], 0) + entry['cost'], 6)
+        
+        total_cost = round(sum(entry['cost'] for entry in entries), 6)
+        if entries or skipped:
+            print(f"API forbrug: {len(entries)} kald, ${total_cost:.4f}"
+                  + (f" ({len(skipped)} sprunget over pga. budget)" if skipped else ""))
+        return {
+            'requests': entries,
+            'total_cost': total_cost,
+            'by_domain': by_domain,
+            'by_endpoint': by_endpoint,
+            'budget': self.budget,
+            'skipped': skipped
+        }
+    
+    def _record_history(self, domains, since=None):
+        """Append the rankings fetched by a run to the history store (cache hits were recorded when fetched)"""
+        if since is not None:
+            domains = [domain for domain in domains if self.raw_cache.get(domain, (0,))[0] >= since]
+        if not domains:
+            return
+        try:
+            store = HistoryStore()
+            try:
+                store.record_analyzer(self, domains)
+            finally:
+                store.close()
+        except Exception as e:
+            print(f"Fejl ved gemning af historik: {e}")
+    
     def _get_domain_keywords(self, domain):
         """Get keywords for a specific domain"""
-        try:
-            response = self.client.get_domain_keywords(domain)
-            if response.get('status_code') == 20000:
-                if response.get('tasks') and response['tasks'][0].get('result'):
-                    raw_data = response['tasks'][0]['result']
-                    filtered_data = self._filter_keywords(raw_data)
-                    
-                    if self.filter_keywords and filtered_data:
-                        total_filtered = sum(len(item.get('items', [])) for item in filtered_data)
-                        total_original = sum(len(item.get('items', [])) for item in raw_data)
-                        print(f"  {domain}: {total_filtered}/{total_original} relevante keywords")
-                    
-                    return filtered_data
+        return self._filter_domain_keywords(domain, self._get_raw_domain_keywords(domain))
+    
+    def _filter_domain_keywords(self, domain, raw_data):
+        """Filter a domain's raw keyword data, reporting how many keywords are relevant"""
+        if not raw_data:
+            return []
+        
+        filtered_data = self._filter_keywords(raw_data)
+        
+        if self.filter_keywords and filtered_data:
+            total_filtered = sum(len(item.get('items', [])) for item in filtered_data)
+            total_original = sum(len(item.get('items', [])) for item in raw_data)
+            print(f"  {domain}: {total_filtered}/{total_original} relevante keywords")
+        
+        return filtered_data
+    
+    def _get_raw_domain_keywords(self, domain):
+        """Get unfiltered keyword results for a domain, served from cache while fresh"""
+        cached = self.raw_cache.get(domain)
+        if self.offline:
+            if cached is None:
+                cached = self._load_raw_data(domain)
+            if cached is None:
+                print(f"  {domain}: ingen gemte data - kør en fuld analyse først")
                 return []
+            self.raw_cache[domain] = cached
+            return cached[1]
+        
+        if cached and time.time() - cached[0] < Config.DOMAIN_CACHE_TTL:
+            return cached[1]
+        
+        try:
+            # A fresh preview slice is the first page of the full fetch, so it is never paid for twice
+            preview = self.preview_pages.pop(domain, None)
+            if preview and time.time() - preview[0] < Config.PREVIEW_PAGE_TTL:
+                raw_data = self._fetch_domain_pages(domain, preview[1])
             else:
-                print(f"Error getting keywords for {domain}: {response.get('status_message')}")
+                raw_data = self._fetch_domain_pages(domain)
+            if raw_data is None:
                 return []
+            if raw_data:
+                self.raw_cache[domain] = (time.time(), raw_data)
+                self._save_raw_data(domain)
+            return raw_data
         except Exception as e:
             print(f"Exception getting keywords for {domain}: {e}")
             return []
     
+    def _fetch_domain_pages(self, domain, first_pages=None):
+        """Fetch up to RANKED_KEYWORDS_MAX_PAGES pages of ranked keywords by search volume, merged into the first result"""
+        limit = Config.RANKED_KEYWORDS_LIMIT
+        max_items = limit * Config.RANKED_KEYWORDS_MAX_PAGES
+        
+        # Copy the first result so merging pages never changes memoized responses
+        raw_data = []
+        if first_pages:
+            raw_data = [dict(first_pages[0], items=list(first_pages[0].get('items') or [])), *first_pages[1:]]
+        
+        while True:
+            fetched = len(raw_data[0]['items']) if raw_data else 0
+            if raw_data and fetched >= min(raw_data[0].get('total_count') or 0, max_items):
+                break
+            
+            page_limit = min(limit, max_items - fetched)
+            response = self.client.get_domain_keywords(
+                domain, limit=page_limit, location_code=self.location_code, language_code=self.language_code,
+                offset=fetched, order_by=Config.RANKED_KEYWORDS_ORDER_BY
+            )
+            if response.get('status_code') != 20000:
+                print(f"Error getting keywords for {domain}: {response.get('status_message')}")
+                # Keep the pages already fetched rather than losing them
+                return raw_data or None
+            if not (response.get('tasks') and response['tasks'][0].get('result')):
+                break
+            
+            result = response['tasks'][0]['result']
+            page_items = (result[0] or {}).get('items') or []
+            if not raw_data:
+                raw_data = [dict(result[0] or {}, items=list(page_items)), *result[1:]]
+            else:
+                raw_data[0]['items'].extend(page_items)
+            
+            if len(page_items) < page_limit:
+                break
+        return raw_data
+    
+    def analyze_preview(self):
+        """Quick approximate analysis from a top-volume slice per domain; a background full run upgrades it in place"""
+        print(f"Preview for {self.target_domain} (top {Config.PREVIEW_LIMIT} keywords pr. domæne efter søgevolumen)")
+        run_id = self.client.new_run()
+        domains = [self.target_domain] + self._fetch_order([
+            competitor for competitor in canonical_domains(self.competitors)
+            if competitor != canonical_domain(self.target_domain)
+        ])
+        skipped = []
+        planned = self._plan_preview(domains, run_id, skipped)
+        with ThreadPoolExecutor(max_workers=Config.MAX_CONCURRENT_REQUESTS) as executor:
+            slices = dict(zip(planned, executor.map(lambda domain: self._get_preview_keywords(domain, run_id), planned)))
+        
+        competitor_data = {
+            competitor: self._filter_keywords(slices.get(competitor) or []) for competitor in domains[1:]
+            if competitor in slices
+        }
+        target_keywords = self._filter_keywords(slices.get(self.target_domain) or [])
+        
+        # Without the target slice every competitor keyword would look like a gap
+        target_missing = slices.get(self.target_domain) is None
+        if target_missing and self.target_domain not in skipped:
+            print(f"  {self.target_domain}: preview fejlede - gaps vises når den fulde analyse er færdig")
+        results = {
+            'target_keywords': target_keywords,
+            'competitor_data': competitor_data,
+            'content_gaps': {} if target_missing else self._find_content_gaps(target_keywords, competitor_data),
+            'target_missing': target_missing,
+            'preview': True
+        }
+        total_gaps = sum(len(gaps) for gaps in results['content_gaps'].values())
+        print(f"  PREVIEW: {total_gaps} foreløbige gaps - fuld analyse fortsætter i baggrunden")
+        
+        upgrader = ThreadPoolExecutor(max_workers=1)
+        future = upgrader.submit(self._complete_preview, results, run_id)
+        upgrader.shutdown(wait=False)
+        return results, future
+    
+    def _plan_preview(self, domains, run_id, skipped):
+        """Domains whose preview slice fits in the budget, in fetch order (the rest are added to skipped)"""
+        if self.budget is None or self.offline:
+            return domains
+        slice_cost = round(Config.COST_PER_REQUEST + Config.PREVIEW_LIMIT * Config.COST_PER_ITEM, 4)
+        planned = []
+        spent = sum(entry['cost'] for entry in self.client.cost_entries(run_id))
+        for domain in domains:
+            # Fresh cached domains cost nothing; once the cap is reached only those are still used
+            cost = 0.0 if self._estimate_domain(domain)['cached'] else slice_cost
+            if cost == 0 or (not skipped and spent + cost <= self.budget):
+                planned.append(domain)
+                spent += cost
+            else:
+                if not skipped:
+                    print(f"  Budget på ${self.budget:.4f} nået - preview springer {domain} over")
+                skipped.append(domain)
+        return planned
+    
+    def _get_preview_keywords(self, domain, run_id):
+        """Fresh cached data if there is any, otherwise one small page ordered by search volume"""
+        with self.client.cost_run(run_id):
+            return self._fetch_preview_slice(domain)
+    
+    def _fetch_preview_slice(self, domain):
+        """First page of a domain's keywords (None if the request failed)"""
+        cached = self.raw_cache.get(domain)
+        if self.offline or (cached and time.time() - cached[0] < Config.DOMAIN_CACHE_TTL):
+            return self._get_raw_domain_keywords(domain)
+        
+        try:
+            response = self.client.get_domain_keywords(
+                domain, limit=Config.PREVIEW_LIMIT, location_code=self.location_code,
+                language_code=self.language_code, order_by=Config.RANKED_KEYWORDS_ORDER_BY
+            )
+        except Exception as e:
+            print(f"Exception getting preview keywords for {domain}: {e}")
+            return None
+        if response.get('status_code') != 20000:
+            print(f"Error getting preview keywords for {domain}: {response.get('status_message')}")
+            return None
+        if not (response.get('tasks') and response['tasks'][0].get('result')):
+            return []
+        
+        raw_data = response['tasks'][0]['result']
+        now = time.time()
+        # Slices of domains that were never fully fetched are dropped once they expire
+        for stale in [d for d, (fetched_at, _) in list(self.preview_pages.items()) if now - fetched_at >= Config.PREVIEW_PAGE_TTL]:
+            self.preview_pages.pop(stale, None)
+        self.preview_pages[domain] = (now, raw_data)
+        return raw_data
+    
+    def _complete_preview(self, results, run_id):
+        """Run the full analysis (continuing from the preview pages) and replace the preview results in place"""
+        try:
+            full_results = self.analyze_content_gap(run_id)
+        except Exception as e:
+            print(f"Fejl under fuld analyse efter preview: {e}")
+            raise
+        # Update before dropping stale keys, so readers of the shared dict never see it empty
+        results.update(full_results, preview=False)
+        for key in [key for key in results if key not in full_results and key != 'preview']:
+            results.pop(key, None)
+        print("Fuld analyse færdig - preview resultaterne er opdateret")
+        return results
+    
+    def apply_changes(self):
+        """Re-run filtering, gap finding and scoring on the stored raw data without API calls"""
+        self.offline = True
+        try:
+            return self.analyze_content_gap()
+        finally:
+            self.offline = False
+    
+    def _raw_data_path(self, domain):
+        """Path of the stored raw data file for a domain"""
+        safe_name = re.sub(r'[^A-Za-z0-9._-]', '_', domain)
+        return os.path.join(self.raw_data_dir, f"{safe_name}.json")
+    
+    def _save_raw_data(self, domain):
+        """Store the unfiltered data from the last fetch of a domain"""
+        fetched_at, raw_data = self.raw_cache[domain]
+        try:
+            os.makedirs(self.raw_data_dir, exist_ok=True)
+            # A unique temp file per writer, so concurrent saves of one domain never share a partial file
+            path = self._raw_data_path(domain)
+            fd, temp_path = tempfile.mkstemp(dir=self.raw_data_dir, prefix=os.path.basename(path), suffix='.tmp')
+            try:
+                with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                    json.dump({'domain': domain, 'fetched_at': fetched_at, 'data': raw_data}, f, ensure_ascii=False)
+                os.replace(temp_path, path)
+            except BaseException:
+                os.unlink(temp_path)
+                raise
+            write_snapshot(self._snapshot_path(domain), domain, fetched_at, raw_data)
+        except Exception as e:
+            print(f"Fejl ved gemning af rå data for {domain}: {e}")
+    
+    def _load_raw_data(self, domain):
+        """Load stored raw data for a domain as a (fetched_at, raw_data) tuple"""
+        path = self._raw_data_path(domain)
+        if not os.path.exists(path):
+            return None
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                stored = json.load(f)
+            return stored['fetched_at'], stored['data']
+        except Exception as e:
+            print(f"Fejl ved indlæsning af rå data for {domain}: {e}")
+            return None
+    
+    def _snapshot_path(self, domain):
+        """Path of the memory-mappable snapshot stored next to a domain's raw data"""
+        return self._raw_data_path(domain)[:-len('.json')] + '.snap'
+    
+    def load_snapshot(self, domain):
+        """Memory-map the stored snapshot of a domain, reusing the mapping until the file changes"""
+        path = self._snapshot_path(domain)
+        try:
+            mtime = os.stat(path).st_mtime_ns
+        except OSError:
+            return None
+        
+        cached = self.snapshots.get(path)
+        if cached and cached[0] == mtime:
+            return cached[1]
+        try:
+            snapshot = DomainSnapshot(path)
+        except Exception as e:
+            print(f"Fejl ved indlæsning af snapshot for {domain}: {e}")
+            return None
+        self.snapshots[path] = (mtime, snapshot)
+        return snapshot
+    
+    def snapshot_gaps(self, competitors=None):
+        """Recompute content gaps from the stored snapshots with array operations instead of parsing JSON"""
+        target = self.load_snapshot(canonical_domain(self.target_domain))
+        if target is None:
+            print(f"  {self.target_domain}: intet snapshot - kør en fuld analyse først")
+            return {}
+        target_keys = target.key_hash[self._snapshot_categories(target)[1]]
+        
+        gaps = {}
+        for competitor in canonical_domains(self.competitors if competitors is None else competitors):
+            snapshot = self.load_snapshot(competitor)
+            if snapshot is None or competitor == target.domain:
+                continue
+            categories, relevant = self._snapshot_categories(snapshot)
+            rows = np.flatnonzero(relevant & ~np.isin(snapshot.key_hash, target_keys))
+            
+            # Sort by key, highest volume first, so the first row of each key is its surface form
+            rows = rows[np.lexsort((-snapshot.search_volume[rows], snapshot.key_hash[rows]))]
+            keys = snapshot.key_hash[rows]
+            starts = np.flatnonzero(np.r_[True, keys[1:] != keys[:-1]]) if len(rows) else rows
+            ends = np.r_[starts[1:], len(rows)].astype(int)
+            if len(rows):
+                # Keys in order of first appearance, like the JSON path
+                order = np.argsort(np.minimum.reduceat(rows, starts), kind='stable')
+                starts, ends = starts[order], ends[order]
+            first = rows[starts]
+            
+            volumes = snapshot.search_volume[first].tolist()
+            ranks = snapshot.rank[first].tolist()
+            # NaN marks a missing value, which the JSON path reports as None
+            competition = [None if value != value else value for value in snapshot.competition[first].tolist()]
+            cpc = [None if value != value else value for value in snapshot.cpc[first].tolist()]
+            gaps[competitor] = [
+                {
+                    'keyword': snapshot.keyword(row),
+                    'search_volume': None if volume == MISSING else volume,
+                    'competition': comp,
+                    'competition_level': snapshot.string(snapshot.competition_level_id[row]),
+                    'cpc': row_cpc,
+                    'competitor_rank': 0 if rank == MISSING else rank,
+                    'competitor_url': snapshot.string(snapshot.url_id[row]),
+                    'categories': categories[row],
+                    'variants': [
+                        snapshot.keyword(variant_row) for variant_row in np.sort(rows[start:end]).tolist()
+                        if snapshot.keyword_id[variant_row] != snapshot.keyword_id[row]
+                    ],
+                    'source': 'competitor'
+                }
+                for row, start, end, volume, rank, comp, row_cpc
+                in zip(first.tolist(), starts.tolist(), ends.tolist(), volumes, ranks, competition, cpc)
+            ]
+        return gaps
+    
+    def _snapshot_categories(self, snapshot):
+        """Treatment categories per snapshot row and the mask of rows that pass the current filter"""
+        pattern, term_categories = self._category_matcher()
+        categories, relevant = snapshot.row_tags(
+            (tuple(self.treatment_keywords), self._categories_key()),
+            lambda keyword: _match_categories(keyword, pattern, term_categories)
+        )
+        if not self.filter_keywords:
+            relevant = np.ones(snapshot.rows, dtype=bool)
+        return categories, relevant
+    
+    def clear_cache(self, domain=None):
+        """Drop cached raw keyword data for one domain or all domains"""
+        if domain is None:
+            self.raw_cache.clear()
+        else:
+            self.raw_cache.pop(domain, None)
+    
     def _find_content_gaps(self, target_keywords, competitor_data):
         """Identify keywords competitors rank for but target doesn't with detailed data"""
         target_kw_set = set()
@@ -73,12 +642,12 @@ class ContentGapAnalyzer:
                 if item and item.get('items'):
                     for kw_item in item['items']:
                         if kw_item and kw_item.get('keyword_data', {}).get('keyword'):
-                            target_kw_set.add(kw_item['keyword_data']['keyword'])
+                            target_kw_set.add(normalize_keyword(kw_item['keyword_data']['keyword']))
 
         gaps = {}
         
         for competitor, data in competitor_data.items():
-            competitor_keywords = {}  # Store keyword with its data
+            competitor_keywords = {}  # Normalized key -> data of the highest volume variant
             if data:
                 for item in data:
                     if item and item.get('items'):
@@ -88,27 +657,42 @@ class ContentGapAnalyzer:
                                 keyword_info = kw_item.get('keyword_data', {}).get('keyword_info', {})
                                 serp_element = kw_item.get('ranked_serp_element', {}).get('serp_item', {})
                                 
-                                competitor_keywords[keyword] = {
-                                    'search_volume': keyword_info.get('search_volume', 0),
+                                key = normalize_keyword(keyword)
+                                existing = competitor_keywords.get(key)
+                                search_volume = keyword_info.get('search_volume', 0)
+                                if existing:
+                                    # Spelling variants of one query are merged, not counted twice
+                                    existing['variants'].append(keyword)
+                                    if (search_volume or 0) <= (existing['search_volume'] or 0):
+                                        continue
+                                
+                                competitor_keywords[key] = {
+                                    'keyword': keyword,
+                                    'search_volume': search_volume,
                                     'competition': keyword_info.get('competition', 0),
                                     'competition_level': keyword_info.get('competition_level', ''),
                                     'cpc': keyword_info.get('cpc', 0),
                                     'rank': serp_element.get('rank_absolute', 0),
-                                    'url': serp_element.get('url', '')
+                                    'url': serp_element.get('url', ''),
+                                    'categories': kw_item.get('treatment_categories', []),
+                                    'variants': existing['variants'] if existing else [keyword]
                                 }
             
             # Find keywords competitor has but target doesn't
             gap_keywords = []
-            for keyword, data in competitor_keywords.items():
-                if keyword not in target_kw_set:
+            for key, data in competitor_keywords.items():
+                if key not in target_kw_set:
                     gap_keywords.append({
-                        'keyword': keyword,
+                        'keyword': data['keyword'],
                         'search_volume': data['search_volume'],
                         'competition': data['competition'],
                         'competition_level': data['competition_level'],
                         'cpc': data['cpc'],
                         'competitor_rank': data['rank'],
-                        'competitor_url': data['url']
+                        'competitor_url': data['url'],
+                        'categories': data['categories'],
+                        'variants': [variant for variant in data['variants'] if variant != data['keyword']],
+                        'source': 'competitor'
                     })
             
             gaps[competitor] = gap_keywords
@@ -156,78 +740,336 @@ class ContentGapAnalyzer:
         # Calculate final score (0-10 scale)
         priority_score = (volume_score * 0.5) + (comp_score * 0.4) + (cpc_bonus * 0.1)
         
-        # Determine priority level
+        return round(priority_score or 0, 2), self._priority_level(priority_score)
+    
+    def _priority_level(self, priority_score):
+        """Map a priority score to its level"""
         if priority_score >= 4:
-            priority_level = 'HØJ'
+            return 'HØJ'
         elif priority_score >= 2.5:
-            priority_level = 'MEDIUM'
+            return 'MEDIUM'
         else:
-            priority_level = 'LAV'
-        
-        return round(priority_score or 0, 2), priority_level
+            return 'LAV'
     
-    def export_to_excel(self, results, filename='content_gap_analysis.xlsx'):
-        """Export results to Excel file"""
+    def score_gap(self, gap_item):
+        """Return a copy of a gap item with priority score and level added"""
+        priority_score, priority_level = self._calculate_priority_score(
+            gap_item.get('search_volume', 0),
+            gap_item.get('competition', 0),
+            gap_item.get('cpc', 0)
+        )
+        scored = dict(gap_item)
+        scored['priority_score'] = priority_score
+        scored['priority_level'] = priority_level
+        return scored
+    
+    def export_to_excel(self, results, filename='content_gap_analysis.xlsx', summary_only=False):
+        """Export results to Excel file (summary_only writes the aggregate sheets and only the top gap rows)"""
+        if results.get('target_missing'):
+            print(f"Ingen eksport - mangler data for {self.target_domain}")
+            return False
         with pd.ExcelWriter(filename, engine='openpyxl') as writer:
-            # Export target keywords
-            if results['target_keywords']:
-                target_df = self._keywords_to_dataframe(results['target_keywords'], 'Target')
-                if not target_df.empty:
-                    target_df.to_excel(writer, sheet_name='Target_Keywords', index=False)
-            
-            # Export competitor keywords
-            for competitor, data in results['competitor_data'].items():
-                if data:
-                    comp_df = self._keywords_to_dataframe(data, competitor)
-                    if not comp_df.empty:
-                        sheet_name = competitor.replace('.', '_').replace('[', '').replace(']', '').replace('*', '').replace('?', '').replace(':', '').replace('/', '\\')[:31]
-                        comp_df.to_excel(writer, sheet_name=sheet_name, index=False)
+            if not summary_only:
+                # Export target keywords
+                if results['target_keywords']:
+                    target_df = self._keywords_to_dataframe(results['target_keywords'], 'Target')
+                    if not target_df.empty:
+                        target_df.to_excel(writer, sheet_name='Target_Keywords', index=False)
+                
+                # Export competitor keywords
+                for competitor, data in results['competitor_data'].items():
+                    if data:
+                        comp_df = self._keywords_to_dataframe(data, competitor)
+                        if not comp_df.empty:
+                            sheet_name = competitor.replace('.', '_').replace('[', '').replace(']', '').replace('*', '').replace('?', '').replace(':', '').replace('/', '\\')[:31]
+                            comp_df.to_excel(writer, sheet_name=sheet_name, index=False)
             
             # Export content gaps with detailed information
-            gaps_data = []
-            for competitor, gap_keywords in results['content_gaps'].items():
-                for gap_item in gap_keywords:
-                    if isinstance(gap_item, dict):  # New detailed format
-                        priority_score, priority_level = self._calculate_priority_score(
-                            gap_item.get('search_volume', 0),
-                            gap_item.get('competition', 0),
-                            gap_item.get('cpc', 0)
-                        )
-                        
-                        gaps_data.append({
-                            'Competitor': competitor,
-                            'Missing_Keyword': gap_item.get('keyword', ''),
-                            'Search_Volume': gap_item.get('search_volume', 0),
-                            'Competition': round(gap_item.get('competition', 0) or 0, 3),
-                            'Competition_Level': gap_item.get('competition_level', ''),
-                            'CPC': round(gap_item.get('cpc', 0) or 0, 2),
-                            'Priority_Score': priority_score,
-                            'Priority_Level': priority_level,
-                            'Competitor_Rank': gap_item.get('competitor_rank', ''),
-                            'Competitor_URL': gap_item.get('competitor_url', '')
-                        })
-                    else:  # Old simple format (backward compatibility)
-                        gaps_data.append({
-                            'Competitor': competitor,
-                            'Missing_Keyword': gap_item,
-                            'Search_Volume': 0,
-                            'Competition': 0,
-                            'Competition_Level': '',
-                            'CPC': 0,
-                            'Priority_Score': 0,
-                            'Priority_Level': 'UNKNOWN',
-                            'Competitor_Rank': '',
-                            'Competitor_URL': ''
-                        })
+            gaps_df = self._gaps_dataframe(results)
+            if not gaps_df.empty:
+                category_df = self._category_summary(gaps_df)
+                pages_df = self.page_opportunities(results)
+                if summary_only:
+                    gaps_df = gaps_df.head(Config.SUMMARY_TOP_ROWS)
+                gaps_df = gaps_df.assign(Categories=gaps_df['Categories'].str.join(', '))
+                gaps_df.to_excel(writer, sheet_name='Top_Content_Gaps' if summary_only else 'Content_Gaps', index=False)
+                if not category_df.empty:
+                    category_df.to_excel(writer, sheet_name='Category_Summary', index=False)
+                if not pages_df.empty:
+                    pages_df.to_excel(writer, sheet_name='Pages_To_Build', index=False)
+            
+            rank_gaps_df = self.rank_gaps(results)
+            if not rank_gaps_df.empty:
+                if summary_only:
+                    rank_gaps_df.head(Config.SUMMARY_TOP_ROWS).to_excel(writer, sheet_name='Top_Rank_Gaps', index=False)
+                else:
+                    rank_gaps_df.to_excel(writer, sheet_name='Rank_Gaps', index=False)
             
-            if gaps_data:
-                gaps_df = pd.DataFrame(gaps_data)
-                # Sort by priority score (highest first)
-                gaps_df = gaps_df.sort_values(['Priority_Score', 'Search_Volume'], ascending=[False, False])
-                if not gaps_df.empty:
-                    gaps_df.to_excel(writer, sheet_name='Content_Gaps', index=False)
+            report_df = self._run_report_dataframe(results.get('run_report'))
+            if not report_df.empty:
+                report_df.to_excel(writer, sheet_name='Run_Report', index=False)
         
         print(f"Results exported to {filename}")
+        return True
+    
+    def _run_report_dataframe(self, run_report):
+        """One row per API request of the run, plus one row per domain skipped by the budget"""
+        if not run_report:
+            return pd.DataFrame()
+        rows = [{
+            'Time': entry['time'],
+            'Endpoint': entry['endpoint'],
+            'Domain': entry['domain'],
+            'Cost': entry['cost'],
+            'Reused': entry['reused'],
+            'Status': entry['status_code']
+        } for entry in run_report['requests']]
+        rows.extend({'Domain': domain, 'Status': 'skipped (budget)'} for domain in run_report['skipped'])
+        return pd.DataFrame(rows)
+    
+    def export_dataset(self, results, output_dir='content_gap_dataset'):
+        """Export target, competitor and gap tables as Parquet (or gzipped CSV) partitioned by competitor"""
+        if results.get('target_missing'):
+            print(f"Ingen eksport - mangler data for {self.target_domain}")
+            return None
+        use_parquet = importlib.util.find_spec('pyarrow') is not None
+        file_format = 'parquet' if use_parquet else 'csv.gz'
+        manifest = {
+            'created': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+            'target_domain': self.target_domain,
+            'format': file_format,
+            'tables': {}
+        }
+        
+        # Drop partitions from earlier exports so removed competitors do not linger
+        for table in ('target_keywords', 'competitor_keywords', 'content_gaps', 'pages_to_build', 'rank_gaps'):
+            shutil.rmtree(os.path.join(output_dir, table), ignore_errors=True)
+        
+        def write_table(df, table, partition=None):
+            directory = os.path.join(output_dir, table)
+            if partition is not None:
+                directory = os.path.join(directory, f"competitor={re.sub(r'[^A-Za-z0-9._-]', '_', partition)}")
+            os.makedirs(directory, exist_ok=True)
+            path = os.path.join(directory, f"part-0.{file_format}")
+            if use_parquet:
+                df.to_parquet(path, index=False)
+            else:
+                df.to_csv(path, index=False, compression='gzip')
+            
+            entry = manifest['tables'].setdefault(table, {
+                'partition_by': 'competitor' if partition is not None else None,
+                'columns': list(df.columns),
+                'files': []
+            })
+            entry['files'].append({
+                'path': os.path.relpath(path, output_dir),
+                'competitor': partition,
+                'rows': len(df)
+            })
+        
+        target_df = self._keywords_to_dataframe(results['target_keywords'], 'Target')
+        if not target_df.empty:
+            write_table(target_df, 'target_keywords')
+        
+        for competitor, data in results['competitor_data'].items():
+            comp_df = self._keywords_to_dataframe(data, competitor)
+            if not comp_df.empty:
+                write_table(comp_df, 'competitor_keywords', competitor)
+        
+        gaps_df = self._gaps_dataframe(results)
+        if not gaps_df.empty:
+            gaps_df['Competitor_Rank'] = pd.to_numeric(gaps_df['Competitor_Rank'], errors='coerce')
+            if not use_parquet:
+                gaps_df['Categories'] = gaps_df['Categories'].str.join(', ')
+            for competitor, competitor_gaps in gaps_df.groupby('Competitor', sort=False):
+                write_table(competitor_gaps, 'content_gaps', competitor)
+        
+            pages_df = self.page_opportunities(results, gaps_df)
+            if not pages_df.empty:
+                write_table(pages_df, 'pages_to_build')
+        
+        rank_gaps_df = self.rank_gaps(results)
+        if not rank_gaps_df.empty:
+            for competitor, competitor_rank_gaps in rank_gaps_df.groupby('Competitor', sort=False):
+                write_table(competitor_rank_gaps, 'rank_gaps', competitor)
+        
+        with open(os.path.join(output_dir, 'manifest.json'), 'w', encoding='utf-8') as f:
+            json.dump(manifest, f, indent=2, ensure_ascii=False)
+        
+        print(f"Dataset ({file_format}) exported to {output_dir}")
+        return manifest
+    
+    def _gaps_dataframe(self, results):
+        """Build the scored content gap table, sorted by priority"""
+        gaps_data = []
+        for competitor, gap_keywords in results['content_gaps'].items():
+            for gap_item in gap_keywords:
+                if isinstance(gap_item, dict):  # New detailed format
+                    scored = self.score_gap(gap_item)
+                    
+                    gaps_data.append({
+                        'Competitor': competitor,
+                        'Source': gap_item.get('source', 'competitor'),
+                        'Missing_Keyword': gap_item.get('keyword', ''),
+                        'Search_Volume': gap_item.get('search_volume', 0),
+                        'Competition': round(gap_item.get('competition', 0) or 0, 3),
+                        'Competition_Level': gap_item.get('competition_level', ''),
+                        'CPC': round(gap_item.get('cpc', 0) or 0, 2),
+                        'Priority_Score': scored['priority_score'],
+                        'Priority_Level': scored['priority_level'],
+                        'Competitor_Rank': gap_item.get('competitor_rank', ''),
+                        'Competitor_URL': gap_item.get('competitor_url', ''),
+                        'Categories': gap_item.get('categories', []),
+                        'Variants': ', '.join(gap_item.get('variants', []))
+                    })
+                else:  # Old simple format (backward compatibility)
+                    gaps_data.append({
+                        'Competitor': competitor,
+                        'Source': 'competitor',
+                        'Missing_Keyword': gap_item,
+                        'Search_Volume': 0,
+                        'Competition': 0,
+                        'Competition_Level': '',
+                        'CPC': 0,
+                        'Priority_Score': 0,
+                        'Priority_Level': 'UNKNOWN',
+                        'Competitor_Rank': '',
+                        'Competitor_URL': '',
+                        'Categories': [],
+                        'Variants': ''
+                    })
+        
+        if not gaps_data:
+            return pd.DataFrame()
+        
+        gaps_df = pd.DataFrame(gaps_data)
+        # Sort by priority score (highest first)
+        return gaps_df.sort_values(['Priority_Score', 'Search_Volume'], ascending=[False, False])
+    
+    def rank_gaps(self, results):
+        """Keywords where the target ranks within striking distance and a competitor ranks at the top"""
+        low, high = Config.STRIKING_DISTANCE_RANKS
+        target_df = self._rank_table(results['target_keywords'])
+        if target_df.empty:
+            return pd.DataFrame()
+        target_df = target_df[target_df['Rank'].between(low, high)]
+        
+        competitor_frames = [
+            self._rank_table(data).assign(Competitor=competitor)
+            for competitor, data in results['competitor_data'].items()
+        ]
+        competitor_frames = [frame for frame in competitor_frames if not frame.empty]
+        if target_df.empty or not competitor_frames:
+            return pd.DataFrame()
+        competitor_df = pd.concat(competitor_frames, ignore_index=True)
+        competitor_df = competitor_df[competitor_df['Rank'] <= Config.RANK_GAP_COMPETITOR_TOP]
+        
+        # Best rank per keyword on each side, then one join for all competitors
+        target_df = target_df.sort_values('Rank').drop_duplicates('Key')
+        competitor_df = competitor_df.sort_values('Rank').drop_duplicates(['Competitor', 'Key'])
+        merged = target_df.merge(
+            competitor_df[['Key', 'Competitor', 'Rank', 'URL']],
+            on='Key', suffixes=('', '_Competitor')
+        )
+        if merged.empty:
+            return pd.DataFrame()
+        
+        merged['Rank_Delta'] = merged['Rank'] - merged['Rank_Competitor']
+        
+        # Same volume and competition bands as _calculate_priority_score, plus how close we already are
+        volume = merged['Search_Volume'].fillna(0).to_numpy()
+        volume_score = np.where(volume > 0, np.searchsorted([10, 50, 100, 500], volume, side='right') + 1, 0)
+        competition = merged['Competition'].fillna(0).to_numpy()
+        comp_score = np.where(competition > 0, 4 - np.searchsorted([0.2, 0.4, 0.6, 0.8], competition, side='right'), 5)
+        proximity_score = 5 * (high - merged['Rank'].to_numpy() + 1) / (high - low + 1)
+        merged['Striking_Score'] = (volume_score * 0.5 + proximity_score * 0.3 + comp_score * 0.2).round(2)
+        merged['Striking_Priority'] = merged['Striking_Score'].map(self._priority_level)
+        
+        merged = merged.rename(columns={
+            'Rank': 'Target_Rank',
+            'URL': 'Target_URL',
+            'Rank_Competitor': 'Competitor_Rank',
+            'URL_Competitor': 'Competitor_URL'
+        })
+        columns = ['Keyword', 'Competitor', 'Target_Rank', 'Competitor_Rank', 'Rank_Delta', 'Search_Volume',
+                   'Competition', 'CPC', 'Striking_Score', 'Striking_Priority', 'Target_URL', 'Competitor_URL']
+        return merged[columns].sort_values(
+            ['Striking_Score', 'Search_Volume'], ascending=[False, False]
+        ).reset_index(drop=True)
+    
+    def _rank_table(self, keyword_data):
+        """Flatten keyword data into one row per ranked keyword, keyed by the normalized keyword"""
+        rows = [
+            (
+                normalize_keyword(kw_item['keyword_data']['keyword']),
+                kw_item['keyword_data']['keyword'],
+                ((kw_item.get('ranked_serp_element') or {}).get('serp_item') or {}).get('rank_absolute'),
+                ((kw_item.get('ranked_serp_element') or {}).get('serp_item') or {}).get('url'),
+                (kw_item['keyword_data'].get('keyword_info') or {}).get('search_volume'),
+                (kw_item['keyword_data'].get('keyword_info') or {}).get('competition'),
+                (kw_item['keyword_data'].get('keyword_info') or {}).get('cpc')
+            )
+            for item in keyword_data or [] if item
+            for kw_item in item.get('items') or []
+            if kw_item and kw_item.get('keyword_data', {}).get('keyword')
+        ]
+        table = pd.DataFrame(rows, columns=['Key', 'Keyword', 'Rank', 'URL', 'Search_Volume', 'Competition', 'CPC'])
+        table['Rank'] = pd.to_numeric(table['Rank'], errors='coerce')
+        return table.dropna(subset=['Rank'])
+    
+    def page_opportunities(self, results, gaps_df=None):
+        """Rank competitor URLs by the missing traffic of their gap keywords, in one grouped pass"""
+        if gaps_df is None:
+            gaps_df = self._gaps_dataframe(results)
+        if gaps_df.empty:
+            return pd.DataFrame()
+        
+        pages = gaps_df[gaps_df['Competitor_URL'].fillna('') != ''].copy()
+        if pages.empty:
+            return pd.DataFrame()
+        
+        pages['Competitor_Rank'] = pd.to_numeric(pages['Competitor_Rank'], errors='coerce')
+        pages['High_Priority'] = pages['Priority_Level'] == 'HØJ'
+        
+        # gaps_df is sorted by priority, so joined keywords list the best gaps first
+        grouped = pages.groupby(['Competitor_URL', 'Competitor'], sort=False)
+        index = grouped.agg(
+            Gap_Count=('Missing_Keyword', 'size'),
+            Total_Search_Volume=('Search_Volume', 'sum'),
+            Avg_Rank=('Competitor_Rank', 'mean'),
+            Avg_Priority_Score=('Priority_Score', 'mean'),
+            High_Priority_Gaps=('High_Priority', 'sum'),
+            Gap_Keywords=('Missing_Keyword', ', '.join)
+        ).reset_index()
+        
+        index['Avg_Rank'] = index['Avg_Rank'].round(1)
+        index['Avg_Priority_Score'] = index['Avg_Priority_Score'].round(2)
+        index['Priority_Level'] = index['Avg_Priority_Score'].map(self._priority_level)
+        index = index.rename(columns={'Competitor_URL': 'URL'})
+        return index.sort_values(
+            ['Total_Search_Volume', 'Avg_Priority_Score'], ascending=[False, False]
+        ).reset_index(drop=True)
+    
+    def _category_summary(self, gaps_df):
+        """Roll up gaps per treatment category and competitor in one grouped aggregation"""
+        exploded = gaps_df.explode('Categories').dropna(subset=['Categories'])
+        if exploded.empty:
+            return pd.DataFrame()
+        
+        # gaps_df is already sorted by priority, so head() picks the top gaps per group
+        grouped = exploded.groupby(['Categories', 'Competitor'], sort=False)
+        summary = grouped.agg(
+            Gap_Count=('Missing_Keyword', 'size'),
+            Total_Search_Volume=('Search_Volume', 'sum'),
+            Avg_CPC=('CPC', 'mean')
+        )
+        summary['Top_Gaps'] = grouped.head(Config.CATEGORY_TOP_GAPS).groupby(
+            ['Categories', 'Competitor'], sort=False
+        )['Missing_Keyword'].agg(', '.join)
+        summary['Avg_CPC'] = summary['Avg_CPC'].round(2)
+        
+        summary = summary.reset_index().rename(columns={'Categories': 'Category'})
+        return summary.sort_values(['Category', 'Total_Search_Volume'], ascending=[True, False])
     
     def _keywords_to_dataframe(self, keyword_data, source):
         """Convert keyword data to pandas DataFrame"""
@@ -253,7 +1095,8 @@ class ContentGapAnalyzer:
                             'Search_Volume': keyword_info.get('search_volume', 0),
                             'Competition': keyword_info.get('competition', 0),
                             'CPC': keyword_info.get('cpc', 0),
-                            'Competition_Level': keyword_info.get('competition_level', '')
+                            'Competition_Level': keyword_info.get('competition_level', ''),
+                            'Categories': ', '.join(kw_item.get('treatment_categories', []))
                         })
         
         return pd.DataFrame(rows)
@@ -263,14 +1106,44 @@ class ContentGapAnalyzer:
         if not self.filter_keywords:
             return True
             
-        keyword_lower = keyword.lower()
-        return any(treatment.lower() in keyword_lower for treatment in self.treatment_keywords)
+        pattern = _compile_treatment_pattern(tuple(self.treatment_keywords))
+        return bool(pattern and pattern.search(normalize_keyword(keyword)))
+    
+    def _treatment_keyword_set(self, keyword_data):
+        """Collect the normalized keywords that match a treatment, regardless of the filter toggle"""
+        pattern = _compile_treatment_pattern(tuple(self.treatment_keywords))
+        keywords = set()
+        if not pattern or not keyword_data:
+            return keywords
+        
+        for item in keyword_data:
+            if item and item.get('items'):
+                for kw_item in item['items']:
+                    keyword = (kw_item or {}).get('keyword_data', {}).get('keyword')
+                    key = normalize_keyword(keyword) if keyword else ''
+                    if key and pattern.search(key):
+                        keywords.add(key)
+        
+        return keywords
+    
+    def _keyword_categories(self, keyword):
+        """Return the treatment categories a keyword matches (empty if it matches no treatment)"""
+        return _match_categories(keyword, *self._category_matcher())
+    
+    def _category_matcher(self):
+        """Treatment pattern and term -> categories map for the current settings, resolved once per batch"""
+        return _compile_treatment_pattern(tuple(self.treatment_keywords)), _term_categories(self._categories_key())
+    
+    def _categories_key(self):
+        """Hashable form of the treatment categories for the matcher cache"""
+        return tuple((name, tuple(keywords)) for name, keywords in self.treatment_categories.items())
     
     def _filter_keywords(self, keyword_data):
-        """Filter keywords to only include relevant treatments"""
-        if not self.filter_keywords or not keyword_data:
+        """Filter keywords to only include relevant treatments, tagging each with its categories"""
+        if not keyword_data:
             return keyword_data
             
+        pattern, term_categories = self._category_matcher()
         filtered_data = []
         for item in keyword_data:
             if item and item.get('items'):
@@ -278,8 +1151,12 @@ class ContentGapAnalyzer:
                 for kw_item in item['items']:
                     if kw_item and kw_item.get('keyword_data', {}).get('keyword'):
                         keyword = kw_item['keyword_data']['keyword']
-                        if self._is_relevant_keyword(keyword):
-                            filtered_items.append(kw_item)
+                        categories = _match_categories(keyword, pattern, term_categories)
+                        if categories or not self.filter_keywords:
+                            # Copy so tags never leak into the cached raw data
+                            tagged_item = dict(kw_item)
+                            tagged_item['treatment_categories'] = categories
+                            filtered_items.append(tagged_item)
                 
                 if filtered_items:
                     filtered_item = item.copy()
@@ -291,18 +1168,24 @@ class ContentGapAnalyzer:
     
     def add_competitor(self, competitor_url):
         """Add a new competitor URL to the analysis"""
-        if competitor_url not in self.competitors:
-            self.competitors.append(competitor_url)
-            print(f"Added competitor: {competitor_url}")
+        competitor = canonical_domain(competitor_url)
+        if not competitor:
+            print(f"Ugyldig konkurrent: {competitor_url}")
+        elif competitor == canonical_domain(self.target_domain):
+            print(f"Competitor {competitor} is the target domain")
+        elif competitor not in self.competitors:
+            self.competitors.append(competitor)
+            print(f"Added competitor: {competitor}")
             self._save_settings()
         else:
-            print(f"Competitor {competitor_url} already exists")
+            print(f"Competitor {competitor} already exists")
     
     def remove_competitor(self, competitor_url):
         """Remove a competitor URL from the analysis"""
-        if competitor_url in self.competitors:
-            self.competitors.remove(competitor_url)
-            print(f"Removed competitor: {competitor_url}")
+        competitor = canonical_domain(competitor_url)
+        if competitor in self.competitors:
+            self.competitors.remove(competitor)
+            print(f"Removed competitor: {competitor}")
             self._save_settings()
         else:
             print(f"Competitor {competitor_url} not found")
@@ -316,7 +1199,9 @@ class ContentGapAnalyzer:
     
     def set_competitors(self, competitor_urls):
         """Set a new list of competitor URLs"""
-        self.competitors = competitor_urls if isinstance(competitor_urls, list) else [competitor_urls]
+        competitor_urls = competitor_urls if isinstance(competitor_urls, list) else [competitor_urls]
+        target = canonical_domain(self.target_domain)
+        self.competitors = [domain for domain in canonical_domains(competitor_urls) if domain != target]
         print(f"Updated competitors list: {self.competitors}")
         self._save_settings()
     
@@ -342,17 +1227,7 @@ class ContentGapAnalyzer:
         """List all current treatment keywords grouped by category"""
         print("Current treatment keywords:")
         
-        # Group keywords by category
-        categories = {
-            'Permanent hårfjerning': ['permanent hårfjerning', 'hårfjerning', 'laser hårfjerning', 'ipl hårfjerning', 'diode laser', 'alexandrite laser', 'epilering', 'hår fjernelse'],
-            'Botox': ['botox', 'botulinum', 'rynkebehandling', 'panderynker', 'kragerødder', 'sveden'],
-            'Filler': ['filler', 'hyaluronsyre', 'læbefiller', 'kindben', 'næsefiller', 'hageforstørrelse'],
-            'Karsprængninger': ['karsprængninger', 'åreknuder', 'blodsprængninger', 'kapillarer', 'couperose', 'rosacea', 'blodkar', 'vaskulære læsioner'],
-            'Pigmentforandringer': ['pigmentforandringer', 'pigmentpletter', 'aldersletter', 'solskader', 'melasma', 'hyperpigmentering', 'misfarvning', 'brune pletter'],
-            'CO2 laser': ['co2 laser', 'fraktionel laser', 'hudfornyelse', 'laser resurfacing', 'ar behandling', 'porereduktion', 'hudstramning', 'laser peeling']
-        }
-        
-        for category, keywords in categories.items():
+        for category, keywords in self.treatment_categories.items():
             active_keywords = [kw for kw in keywords if kw in self.treatment_keywords]
             if active_keywords:
                 print(f"\n{category}:")
@@ -361,7 +1236,7 @@ class ContentGapAnalyzer:
         
         # Show any custom keywords not in predefined categories
         all_predefined = []
-        for keywords in categories.values():
+        for keywords in self.treatment_categories.values():
             all_predefined.extend(keywords)
         
         custom_keywords = [kw for kw in self.treatment_keywords if kw not in all_predefined]
@@ -378,6 +1253,12 @@ class ContentGapAnalyzer:
         print(f"Updated treatment keywords: {len(self.treatment_keywords)} keywords")
         self._save_settings()
     
+    def set_treatment_categories(self, categories):
+        """Set the treatment categories as a {category: [keywords]} mapping"""
+        self.treatment_categories = {name: list(keywords) for name, keywords in categories.items()}
+        print(f"Updated treatment categories: {len(self.treatment_categories)} categories")
+        self._save_settings()
+    
     def toggle_keyword_filtering(self):
         """Toggle keyword filtering on/off"""
         self.filter_keywords = not self.filter_keywords
@@ -386,6 +1267,16 @@ class ContentGapAnalyzer:
         self._save_settings()
         return self.filter_keywords
     
+    def set_keyword_expansion(self, seed_source):
+        """Set the seed source for keyword idea expansion ('treatments', 'gaps' or None)"""
+        if seed_source not in (None, 'treatments', 'gaps'):
+            print(f"Ugyldig seed kilde: {seed_source}")
+            return self.keyword_expansion
+        self.keyword_expansion = seed_source
+        print(f"Keyword udvidelse: {seed_source or 'fra'}")
+        self._save_settings()
+        return self.keyword_expansion
+    
     def _load_settings(self):
         """Load settings from JSON file"""
         try:
@@ -393,18 +1284,22 @@ class ContentGapAnalyzer:
                 with open(self.settings_file, 'r', encoding='utf-8') as f:
                     settings = json.load(f)
                 
-                self.competitors = settings.get('competitors', Config.COMPETITOR_DOMAINS)
+                self.competitors = canonical_domains(settings.get('competitors', Config.COMPETITOR_DOMAINS))
                 self.treatment_keywords = settings.get('treatment_keywords', Config.TREATMENT_KEYWORDS)
+                self.treatment_categories = settings.get('treatment_categories', Config.TREATMENT_CATEGORIES)
                 self.filter_keywords = settings.get('filter_keywords', True)
-                self.target_domain = settings.get('target_domain', Config.TARGET_DOMAIN)
+                self.target_domain = canonical_domain(settings.get('target_domain', Config.TARGET_DOMAIN))
+                self.keyword_expansion = settings.get('keyword_expansion')
                 
                 print(f"Indstillinger indlæst: {len(self.competitors)} konkurrenter, {len(self.treatment_keywords)} keywords")
             else:
                 # Use default settings
                 self.competitors = Config.COMPETITOR_DOMAINS.copy()
                 self.treatment_keywords = Config.TREATMENT_KEYWORDS.copy()
+                self.treatment_categories = Config.TREATMENT_CATEGORIES.copy()
                 self.filter_keywords = True
                 self.target_domain = Config.TARGET_DOMAIN
+                self.keyword_expansion = None
                 print("Bruger standard indstillinger")
                 
         except Exception as e:
@@ -412,8 +1307,10 @@ class ContentGapAnalyzer:
             # Fallback to defaults
             self.competitors = Config.COMPETITOR_DOMAINS.copy()
             self.treatment_keywords = Config.TREATMENT_KEYWORDS.copy()
+            self.treatment_categories = Config.TREATMENT_CATEGORIES.copy()
             self.filter_keywords = True
             self.target_domain = Config.TARGET_DOMAIN
+            self.keyword_expansion = None
     
     def _save_settings(self):
         """Save current settings to JSON file"""
@@ -421,8 +1318,10 @@ class ContentGapAnalyzer:
             settings = {
                 'competitors': self.competitors,
                 'treatment_keywords': self.treatment_keywords,
+                'treatment_categories': self.treatment_categories,
                 'filter_keywords': self.filter_keywords,
                 'target_domain': self.target_domain,
+                'keyword_expansion': self.keyword_expansion,
                 'last_updated': datetime.now().strftime('%Y-%m-%d %H:%M:%S')
             }
             
@@ -444,8 +1343,8 @@ class ContentGapAnalyzer:
     
     def set_target_domain(self, domain):
         """Set a new target domain for analysis"""
-        if domain and domain.strip():
-            self.target_domain = domain.strip()
+        if canonical_domain(domain):
+            self.target_domain = canonical_domain(domain)
             print(f"Target domain ændret til: {self.target_domain}")
             self._save_settings()
         else:
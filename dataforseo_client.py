@@ -1,5 +1,10 @@
 import requests
 import json
+import threading
+import time
+from collections import OrderedDict, deque
+from contextlib import contextmanager
+from concurrent.futures import Future
 from config import Config
 
 class DataForSEOClient:
@@ -8,52 +13,174 @@ class DataForSEOClient:
         self.password = Config.DATAFORSEO_PASSWORD
         self.base_url = Config.BASE_URL
         
+        # Reuse one session so keep-alive connections stay warm between calls
+        self.session = requests.Session()
+        self.session.auth = (self.login, self.password)
+        
+        # Shared limits for every request made through this client, across threads
+        self._concurrency = threading.Semaphore(Config.MAX_CONCURRENT_REQUESTS)
+        self._rate_lock = threading.Lock()
+        self._next_request_at = 0.0
+        
+        # Per-request cost log, tagged with the run id active on the calling thread
+        self._cost_log = deque(maxlen=Config.COST_LOG_MAX_ENTRIES)
+        self._run_seq = 0
+        self._local = threading.local()
+        
+        # Identical POST payloads share one in-flight request and one parsed result
+        self._lock = threading.Lock()
+        self._inflight = {}
+        self._responses = OrderedDict()
+        
     def _make_request(self, endpoint, data=None):
+        if not data:
+            return self._send_request(endpoint)
+        
+        key = (endpoint, json.dumps(data, sort_keys=True))
+        with self._lock:
+            cached = self._responses.get(key)
+            if cached and time.time() - cached[0] < Config.REQUEST_MEMO_TTL:
+                self._record_cost(endpoint, data, cached[1], reused=True)
+                return cached[1]
+            future = self._inflight.get(key)
+            is_owner = future is None
+            if is_owner:
+                future = Future()
+                self._inflight[key] = future
+        
+        if not is_owner:
+            result = future.result()
+            with self._lock:
+                self._record_cost(endpoint, data, result, reused=True)
+            return result
+        
+        try:
+            result = self._send_request(endpoint, data)
+            with self._lock:
+                self._record_cost(endpoint, data, result)
+            if result.get('status_code') == 20000:
+                with self._lock:
+                    self._store_response(key, result)
+            future.set_result(result)
+            return result
+        except Exception as e:
+            future.set_exception(e)
+            raise
+        finally:
+            with self._lock:
+                self._inflight.pop(key, None)
+    
+    def _store_response(self, key, result):
+        """Memoize a response, evicting expired and oldest entries (callers hold self._lock)"""
+        now = time.time()
+        self._responses.pop(key, None)
+        self._responses[key] = (now, result)
+        # Entries are kept in insertion order, so expired ones are always at the front
+        while self._responses:
+            stored_at = next(iter(self._responses.values()))[0]
+            if now - stored_at < Config.REQUEST_MEMO_TTL and len(self._responses) <= Config.REQUEST_MEMO_MAX_ENTRIES:
+                break
+            self._responses.popitem(last=False)
+    
+    def _send_request(self, endpoint, data=None):
         url = f"{self.base_url}/{endpoint}"
         
-        if data:
-            response = requests.post(
-                url,
-                auth=(self.login, self.password),
-                headers={'Content-Type': 'application/json'},
-                data=json.dumps(data)
-            )
-        else:
-            response = requests.get(
-                url,
-                auth=(self.login, self.password)
-            )
+        with self._concurrency:
+            self._wait_for_rate_limit()
+            if data:
+                response = self.session.post(
+                    url,
+                    headers={'Content-Type': 'application/json'},
+                    data=json.dumps(data)
+                )
+            else:
+                response = self.session.get(url)
         
         return response.json()
     
-    def get_domain_keywords(self, domain, limit=1000):
+    def _wait_for_rate_limit(self):
+        """Space request starts so the client stays under MAX_REQUESTS_PER_MINUTE"""
+        interval = 60.0 / Config.MAX_REQUESTS_PER_MINUTE
+        with self._rate_lock:
+            now = time.monotonic()
+            start_at = max(now, self._next_request_at)
+            self._next_request_at = start_at + interval
+        if start_at > now:
+            time.sleep(start_at - now)
+    
+    def _record_cost(self, endpoint, data, result, reused=False):
+        """Log the cost of one request under the current run (callers hold self._lock)"""
+        task_data = data[0] if data else {}
+        self._cost_log.append({
+            'run': getattr(self._local, 'run_id', None),
+            'time': time.strftime('%Y-%m-%d %H:%M:%S'),
+            'endpoint': endpoint,
+            'domain': task_data.get('target') or f"{len(task_data.get('keywords', []))} seeds",
+            'location_code': task_data.get('location_code'),
+            'cost': 0 if reused else (result.get('cost') or 0),
+            'reused': reused,
+            'status_code': result.get('status_code')
+        })
+    
+    def new_run(self):
+        """Allocate an id to group the requests of one run in the cost log"""
+        with self._lock:
+            self._run_seq += 1
+            return self._run_seq
+    
+    @contextmanager
+    def cost_run(self, run_id):
+        """Log requests made by the current thread under run_id"""
+        previous = getattr(self._local, 'run_id', None)
+        self._local.run_id = run_id
+        try:
+            yield run_id
+        finally:
+            self._local.run_id = previous
+    
+    def cost_entries(self, run_id):
+        """Logged requests of one run"""
+        with self._lock:
+            return [entry for entry in self._cost_log if entry['run'] == run_id]
+    
+    def clear_responses(self):
+        """Forget memoized responses so the next identical request hits the API again"""
+        with self._lock:
+            self._responses.clear()
+    
+    def get_domain_keywords(self, domain, limit=1000, location_code=None, language_code=None, offset=0,
+                            order_by=None):
         """Get organic keywords for a domain"""
         data = [{
             "target": domain,
-            "location_code": Config.LOCATION_CODE,
-            "language_code": Config.LANGUAGE_CODE,
+            "location_code": location_code or Config.LOCATION_CODE,
+            "language_code": language_code or Config.LANGUAGE_CODE,
             "limit": limit
         }]
+        if offset:
+            data[0]["offset"] = offset
+        if order_by:
+            data[0]["order_by"] = order_by
         
         return self._make_request("dataforseo_labs/google/ranked_keywords/live", data)
     
-    def get_competitors_keywords(self, domain):
+    def get_competitors_keywords(self, domain, limit=1000, location_code=None, language_code=None):
         """Get competitor keywords analysis"""
         data = [{
             "target": domain,
-            "location_code": Config.LOCATION_CODE,
-            "language_code": Config.LANGUAGE_CODE,
-            "limit": 1000
+            "location_code": location_code or Config.LOCATION_CODE,
+            "language_code": language_code or Config.LANGUAGE_CODE,
+            "limit": limit
         }]
         
         return self._make_request("dataforseo_labs/google/competitors_domain/live", data)
     
-    def get_keyword_ideas(self, keywords, limit=1000):
+    def get_keyword_ideas(self, keywords, limit=1000, location_code=None, language_code=None):
         """Get keyword ideas for seed keywords"""
         data = [{
             "keywords": keywords if isinstance(keywords, list) else [keywords],
-            "location_code": Config.LOCATION_CODE,
-            "language_code": Config.LANGUAGE_CODE,
+            "location_code": location_code or Config.LOCATION_CODE,
+            "language_code": language_code or Config.LANGUAGE_CODE,
             "limit": limit
         }]
         
@@ -0,0 +1,202 @@
+#!/usr/bin/env python3
+
+import argparse
+import hashlib
+import json
+import mmap
+import os
+import struct
+import tempfile
+
+import numpy as np
+
+from keyword_normalization import normalize_keyword
+from config import Config
+
+SNAPSHOT_MAGIC = b'CGSNAP01'
+SNAPSHOT_VERSION = 2
+_ALIGNMENT = 8
+
+# Fixed-width columns, one row per ranked keyword (string columns hold ids into the string table)
+SNAPSHOT_COLUMNS = {
+    'key_hash': '<u8',
+    'keyword_id': '<u4',
+    'url_id': '<u4',
+    'title_id': '<u4',
+    'competition_level_id': '<u4',
+    'rank': '<i4',
+    'search_volume': '<i8',
+    'competition': '<f8',
+    'cpc': '<f8'
+}
+
+MISSING = -1  # rank and search_volume value for missing data (floats use NaN)
+
+
+def keyword_key_hash(keyword):
+    """64-bit hash of a keyword's normalized key, comparable across snapshots without decoding strings"""
+    key = normalize_keyword(keyword).encode('utf-8')
+    return int.from_bytes(hashlib.blake2b(key, digest_size=8).digest(), 'little')
+
+
+def write_snapshot(path, domain, fetched_at, raw_data):
+    """Write the ranked keywords of one domain as a memory-mappable snapshot file"""
+    strings = {'': 0}
+
+    def string_id(value):
+        return strings.setdefault(value or '', len(strings))
+
+    rows = []
+    total_count = None
+    for item in raw_data or []:
+        if not item:
+            continue
+        total_count = item.get('total_count', total_count)
+        for kw_item in item.get('items') or []:
+            keyword = (kw_item or {}).get('keyword_data', {}).get('keyword')
+            if not keyword:
+                continue
+            keyword_info = kw_item['keyword_data'].get('keyword_info') or {}
+            serp_item = (kw_item.get('ranked_serp_element') or {}).get('serp_item') or {}
+            rows.append((
+                keyword_key_hash(keyword),
+                string_id(keyword),
+                string_id(serp_item.get('url')),
+                string_id(serp_item.get('title')),
+                string_id(keyword_info.get('competition_level')),
+                MISSING if serp_item.get('rank_absolute') is None else serp_item['rank_absolute'],
+                MISSING if keyword_info.get('search_volume') is None else keyword_info['search_volume'],
+                np.nan if keyword_info.get('competition') is None else keyword_info['competition'],
+                np.nan if keyword_info.get('cpc') is None else keyword_info['cpc']
+            ))
+
+    encoded = [value.encode('utf-8') for value in strings]
+    string_offsets = np.zeros(len(encoded) + 1, dtype='<u8')
+    string_offsets[1:] = np.cumsum([len(value) for value in encoded])
+    arrays = {
+        name: np.array([row[i] for row in rows], dtype=dtype)
+        for i, (name, dtype) in enumerate(SNAPSHOT_COLUMNS.items())
+    }
+    arrays['string_offsets'] = string_offsets
+    arrays['string_data'] = np.frombuffer(b''.join(encoded), dtype='u1')
+
+    # Array offsets are relative to the end of the header block and aligned for zero-copy views
+    layout = {}
+    offset = 0
+    for name, array in arrays.items():
+        layout[name] = {'dtype': array.dtype.str, 'offset': offset, 'count': len(array)}
+        offset += -(-array.nbytes // _ALIGNMENT) * _ALIGNMENT
+
+    header = json.dumps({
+        'version': SNAPSHOT_VERSION,
+        'domain': domain,
+        'fetched_at': fetched_at,
+        'total_count': total_count,
+        'rows': len(rows),
+        'arrays': layout
+    }).encode('utf-8')
+    header_size = -(-(len(SNAPSHOT_MAGIC) + 4 + len(header)) // _ALIGNMENT) * _ALIGNMENT
+
+    # Write to a unique temporary file first; processes that still map the old file keep a valid view,
+    # and concurrent writers of one domain never truncate each other's file
+    fd, temp_path = tempfile.mkstemp(dir=os.path.dirname(path) or '.', prefix=os.path.basename(path), suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(SNAPSHOT_MAGIC + struct.pack('<I', len(header)) + header)
+            f.write(b'\0' * (header_size - f.tell()))
+            for name, array in arrays.items():
+                f.seek(header_size + layout[name]['offset'])
+                f.write(array.tobytes())
+            f.truncate(header_size + offset)
+        os.replace(temp_path, path)
+    except BaseException:
+        os.unlink(temp_path)
+        raise
+    return len(rows)
+
+
+class DomainSnapshot:
+    """Read-only memory-mapped view of one domain snapshot; columns are zero-copy numpy arrays"""
+
+    def __init__(self, path):
+        self.path = path
+        with open(path, 'rb') as f:
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+        if self._mmap[:len(SNAPSHOT_MAGIC)] != SNAPSHOT_MAGIC:
+            raise ValueError(f"{path} is not a snapshot file")
+        magic_size = len(SNAPSHOT_MAGIC)
+        (header_length,) = struct.unpack_from('<I', self._mmap, magic_size)
+        header = json.loads(self._mmap[magic_size + 4:magic_size + 4 + header_length])
+        if header['version'] != SNAPSHOT_VERSION:
+            raise ValueError(f"{path} has unsupported snapshot version {header['version']}, rebuild it with domain_snapshot.py")
+        header_size = -(-(magic_size + 4 + header_length) // _ALIGNMENT) * _ALIGNMENT
+
+        self.domain = header['domain']
+        self.fetched_at = header['fetched_at']
+        self.total_count = header['total_count']
+        self.rows = header['rows']
+        for name, spec in header['arrays'].items():
+            array = np.frombuffer(
+                self._mmap, dtype=spec['dtype'], count=spec['count'], offset=header_size + spec['offset']
+            )
+            setattr(self, name, array)
+
+        self._strings = {}
+        self._tags = {}
+
+    def string(self, string_id):
+        """Decode one entry of the string table"""
+        string_id = int(string_id)
+        if string_id not in self._strings:
+            start, end = self.string_offsets[string_id], self.string_offsets[string_id + 1]
+            self._strings[string_id] = self.string_data[start:end].tobytes().decode('utf-8')
+        return self._strings[string_id]
+
+    def keyword(self, row):
+        return self.string(self.keyword_id[row])
+
+    def row_tags(self, cache_key, classify):
+        """Per-row classify(keyword) results and a mask of the non-empty ones, memoized per cache_key"""
+        if cache_key not in self._tags:
+            tags = [classify(self.keyword(row)) for row in range(self.rows)]
+            self._tags[cache_key] = (tags, np.fromiter(map(bool, tags), dtype=bool, count=self.rows))
+        return self._tags[cache_key]
+
+    def close(self):
+        # Drop the array views first; an mmap cannot close while buffers still point into it
+        for name in [*SNAPSHOT_COLUMNS, 'string_offsets', 'string_data']:
+            self.__dict__.pop(name, None)
+        try:
+            self._mmap.close()
+        except BufferError:
+            pass
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build snapshot files from the stored raw JSON data")
+    parser.add_argument('--dir', default=Config.RAW_DATA_DIR)
+    args = parser.parse_args()
+
+    if not os.path.isdir(args.dir):
+        print(f"Ingen gemte data i {args.dir}")
+        return
+
+    built = 0
+    for filename in sorted(os.listdir(args.dir)):
+        if not filename.endswith('.json'):
+            continue
+        path = os.path.join(args.dir, filename)
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                stored = json.load(f)
+            rows = write_snapshot(path[:-len('.json')] + '.snap', stored['domain'], stored['fetched_at'], stored['data'])
+            print(f"  {stored['domain']}: {rows} keywords")
+            built += 1
+        except Exception as e:
+            print(f"Fejl ved snapshot af {filename}: {e}")
+    print(f"{built} snapshots skrevet i {args.dir}")
+
+
+if __name__ == "__main__":
+    main()
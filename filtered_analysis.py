@@ -6,22 +6,19 @@ def main():
     print("Content Gap Analysis med behandlingsfiltrering")
     print("=" * 50)
     
-    print("Analyserer kun relevante behandlingstyper:")
-    print("• Permanent hårfjerning")
-    print("• Botox")
-    print("• Filler") 
-    print("• Karsprængninger")
-    print("• Pigmentforandringer")
-    print("• CO2 laser")
-    print()
-    
     # Opret analyzer med keyword filtrering aktiveret
     analyzer = ContentGapAnalyzer(filter_keywords=True)
     
+    print("Analyserer kun relevante behandlingstyper:")
+    for category in analyzer.treatment_categories:
+        print(f"• {category}")
+    print()
+    
     print("Starter filtreret analyse...")
     try:
         results = analyzer.analyze_content_gap()
-        analyzer.export_to_excel(results, 'filtered_content_gap_analysis.xlsx')
+        if not analyzer.export_to_excel(results, 'filtered_content_gap_analysis.xlsx'):
+            return
         
         print("\nFiltreret analyse færdig!")
         print("Check 'filtered_content_gap_analysis.xlsx' for kun relevante behandlinger.")
@@ -0,0 +1,226 @@
+#!/usr/bin/env python3
+
+import argparse
+import sqlite3
+from datetime import date, datetime
+
+import pandas as pd
+
+from keyword_normalization import normalize_keyword
+from config import Config
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    domain TEXT NOT NULL,
+    run_date TEXT NOT NULL,
+    keyword_count INTEGER NOT NULL,
+    PRIMARY KEY (domain, run_date)
+) WITHOUT ROWID;
+
+CREATE TABLE IF NOT EXISTS rankings (
+    domain TEXT NOT NULL,
+    keyword TEXT NOT NULL,
+    run_date TEXT NOT NULL,
+    rank INTEGER,
+    url TEXT,
+    search_volume INTEGER,
+    cpc REAL,
+    keyword_key TEXT,
+    PRIMARY KEY (domain, run_date, keyword)
+) WITHOUT ROWID;
+"""
+
+# Created after the keyword_key migration, since older databases lack the column
+INDEXES = """
+DROP INDEX IF EXISTS idx_rankings_keyword_date;
+CREATE INDEX IF NOT EXISTS idx_rankings_key_date ON rankings (keyword_key, run_date);
+CREATE INDEX IF NOT EXISTS idx_rankings_domain_date_key ON rankings (domain, run_date, keyword_key);
+CREATE INDEX IF NOT EXISTS idx_rankings_date_domain ON rankings (run_date, domain, rank, search_volume);
+"""
+
+# Latest stored run per domain on or before a given date
+LATEST_RUNS_SQL = """
+SELECT domain, MAX(run_date) AS run_date FROM runs WHERE run_date <= ? GROUP BY domain
+"""
+
+
+class HistoryStore:
+    """Append-only SQLite store of normalized ranking rows per domain and run date"""
+
+    def __init__(self, db_path=Config.HISTORY_DB):
+        self.db_path = db_path
+        self.conn = sqlite3.connect(db_path, check_same_thread=False)
+        self.conn.executescript(SCHEMA)
+        self._migrate_keyword_key()
+        self.conn.executescript(INDEXES)
+
+    def _migrate_keyword_key(self):
+        """Add and backfill the normalized keyword column on databases created before it existed"""
+        columns = {row[1] for row in self.conn.execute("PRAGMA table_info(rankings)")}
+        with self.conn:
+            if 'keyword_key' not in columns:
+                self.conn.execute("ALTER TABLE rankings ADD COLUMN keyword_key TEXT")
+            keywords = [row[0] for row in self.conn.execute("SELECT DISTINCT keyword FROM rankings WHERE keyword_key IS NULL")]
+            self.conn.executemany(
+                "UPDATE rankings SET keyword_key = ? WHERE keyword = ? AND keyword_key IS NULL",
+                [(normalize_keyword(keyword), keyword) for keyword in keywords]
+            )
+
+    def close(self):
+        self.conn.close()
+
+    def record_domain(self, domain, raw_data, run_date=None):
+        """Store one domain's ranked keywords for a run date (a rerun on the same date replaces it)"""
+        run_date = run_date or date.today().isoformat()
+        rows = {}
+        for item in raw_data or []:
+            for kw_item in (item or {}).get('items') or []:
+                keyword = (kw_item or {}).get('keyword_data', {}).get('keyword')
+                if not keyword:
+                    continue
+                keyword_info = kw_item['keyword_data'].get('keyword_info') or {}
+                serp_item = (kw_item.get('ranked_serp_element') or {}).get('serp_item') or {}
+                rows[keyword] = (
+                    domain, keyword, run_date,
+                    serp_item.get('rank_absolute'),
+                    serp_item.get('url'),
+                    keyword_info.get('search_volume'),
+                    keyword_info.get('cpc'),
+                    normalize_keyword(keyword)
+                )
+
+        with self.conn:
+            self.conn.execute("DELETE FROM rankings WHERE domain = ? AND run_date = ?", (domain, run_date))
+            self.conn.executemany("INSERT INTO rankings VALUES (?, ?, ?, ?, ?, ?, ?, ?)", rows.values())
+            self.conn.execute(
+                "INSERT OR REPLACE INTO runs VALUES (?, ?, ?)", (domain, run_date, len(rows))
+            )
+        return len(rows)
+
+    def record_analyzer(self, analyzer, domains):
+        """Store the cached unfiltered data of the given domains, dated by when each was fetched"""
+        recorded = 0
+        for domain in domains:
+            cached = analyzer.raw_cache.get(domain)
+            if cached:
+                run_date = datetime.fromtimestamp(cached[0]).date().isoformat()
+                recorded += self.record_domain(domain, cached[1], run_date)
+        print(f"Historik: {recorded} rækker gemt i {self.db_path}")
+        return recorded
+
+    def keyword_trajectory(self, keyword, domains=None, start=None, end=None):
+        """Rank and URL over time for a keyword and its spelling variants, optionally limited to some domains"""
+        sql = "SELECT run_date, domain, keyword, rank, url, search_volume FROM rankings WHERE keyword_key = ?"
+        params = [normalize_keyword(keyword)]
+        sql, params = self._date_range(sql, params, start, end)
+        if domains:
+            sql += f" AND domain IN ({','.join('?' * len(domains))})"
+            params.extend(domains)
+        return pd.read_sql_query(sql + " ORDER BY run_date, domain", self.conn, params=params)
+
+    def domain_share(self, start=None, end=None, max_rank=10):
+        """Per run date and domain: top-N keyword count, visible search volume and share of that volume"""
+        sql = """
+            SELECT run_date, domain,
+                   COUNT(*) AS keywords,
+                   SUM(COALESCE(search_volume, 0)) AS visible_volume
+            FROM rankings
+            WHERE rank <= ?
+        """
+        params = [max_rank]
+        sql, params = self._date_range(sql, params, start, end)
+        share_df = pd.read_sql_query(sql + " GROUP BY run_date, domain", self.conn, params=params)
+        if share_df.empty:
+            return share_df
+
+        totals = share_df.groupby('run_date')['visible_volume'].transform('sum')
+        share_df['share'] = (share_df['visible_volume'] / totals.where(totals > 0)).fillna(0).round(4)
+        return share_df.sort_values(['run_date', 'share'], ascending=[True, False]).reset_index(drop=True)
+
+    def gaps_as_of(self, target_domain, as_of, competitors=None):
+        """Gap keywords using each domain's latest run on or before a date, matched on the normalized keyword"""
+        # MIN(rank) makes SQLite take the other columns from the best ranked variant of each keyword
+        sql = f"""
+            WITH latest AS ({LATEST_RUNS_SQL})
+            SELECT r.keyword, r.keyword_key, r.domain, MIN(r.rank) AS rank, r.url, r.search_volume
+            FROM rankings r JOIN latest l ON r.domain = l.domain AND r.run_date = l.run_date
+            WHERE r.domain != ?
+              AND NOT EXISTS (
+                  SELECT 1 FROM rankings t JOIN latest lt
+                    ON t.domain = lt.domain AND t.run_date = lt.run_date
+                  WHERE t.domain = ? AND t.keyword_key = r.keyword_key
+              )
+        """
+        params = [as_of, target_domain, target_domain]
+        if competitors:
+            sql += f" AND r.domain IN ({','.join('?' * len(competitors))})"
+            params.extend(competitors)
+        sql += " GROUP BY r.domain, r.keyword_key"
+        return pd.read_sql_query(sql, self.conn, params=params)
+
+    def gap_changes(self, target_domain, start, end, competitors=None, keyword_filter=None):
+        """Gaps that opened or closed between two dates"""
+        before = self.gaps_as_of(target_domain, start, competitors)
+        after = self.gaps_as_of(target_domain, end, competitors)
+        if keyword_filter:
+            before = before[before['keyword'].map(keyword_filter)]
+            after = after[after['keyword'].map(keyword_filter)]
+
+        before_keys = set(before['keyword_key'])
+        after_keys = set(after['keyword_key'])
+        opened = after[~after['keyword_key'].isin(before_keys)].assign(change='opened')
+        closed = before[~before['keyword_key'].isin(after_keys)].assign(change='closed')
+        return pd.concat([opened, closed], ignore_index=True).drop(columns='keyword_key')
+
+    def _date_range(self, sql, params, start, end):
+        if start:
+            sql += " AND run_date >= ?"
+            params.append(start)
+        if end:
+            sql += " AND run_date <= ?"
+            params.append(end)
+        return sql, params
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Query the ranking history")
+    parser.add_argument('--db', default=Config.HISTORY_DB)
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    trajectory_parser = subparsers.add_parser('trajectory', help="Rank over time for a keyword")
+    trajectory_parser.add_argument('keyword')
+    trajectory_parser.add_argument('--domain', action='append', dest='domains')
+    trajectory_parser.add_argument('--start')
+    trajectory_parser.add_argument('--end')
+
+    share_parser = subparsers.add_parser('share', help="Domain share of top-10 search volume over time")
+    share_parser.add_argument('--start')
+    share_parser.add_argument('--end')
+    share_parser.add_argument('--max-rank', type=int, default=10)
+
+    gaps_parser = subparsers.add_parser('gaps', help="Gaps opened or closed between two dates")
+    gaps_parser.add_argument('--start', required=True)
+    gaps_parser.add_argument('--end', default=date.today().isoformat())
+    gaps_parser.add_argument('--target', default=None)
+
+    args = parser.parse_args()
+    store = HistoryStore(args.db)
+
+    if args.command == 'trajectory':
+        result = store.keyword_trajectory(args.keyword, args.domains, args.start, args.end)
+    elif args.command == 'share':
+        result = store.domain_share(args.start, args.end, args.max_rank)
+    else:
+        from content_gap_analyzer import ContentGapAnalyzer, canonical_domain
+        analyzer = ContentGapAnalyzer()
+        target = canonical_domain(args.target) if args.target else analyzer.target_domain
+        result = store.gap_changes(
+            target, args.start, args.end, analyzer.competitors, analyzer._is_relevant_keyword
+        )
+
+    print(result.to_string(index=False) if not result.empty else "Ingen data")
+    store.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -1,6 +1,7 @@
 #!/usr/bin/env python3
 
 from content_gap_analyzer import ContentGapAnalyzer
+from competitor_discovery import CompetitorDiscovery
 
 def show_main_menu():
     print("\n" + "="*60)
@@ -11,8 +12,9 @@ def show_main_menu():
     print("3.  🌐 Administrer target domain")
     print("4.  ⚙️  Indstillinger")
     print("5.  🚀 Start content gap analyse")
-    print("6.  📊 Vis status")
-    print("7.  ❌ Exit")
+    print("6.  ♻️  Anvend ændringer på seneste data (ingen API kald)")
+    print("7.  📊 Vis status")
+    print("8.  ❌ Exit")
     print("="*60)
 
 def manage_competitors(analyzer):
@@ -24,9 +26,10 @@ def manage_competitors(analyzer):
         print("2. Tilføj konkurrent")
         print("3. Fjern konkurrent")
         print("4. Sæt ny konkurrentliste")
-        print("5. Tilbage til hovedmenu")
+        print("5. Find konkurrenter automatisk")
+        print("6. Tilbage til hovedmenu")
         
-        choice = input("\nVælg (1-5): ").strip()
+        choice = input("\nVælg (1-6): ").strip()
         
         if choice == '1':
             analyzer.list_competitors()
@@ -60,11 +63,37 @@ def manage_competitors(analyzer):
                 print("Ingen URLs indtastet")
                 
         elif choice == '5':
+            discover_competitors(analyzer)
+                
+        elif choice == '6':
             break
             
         else:
             print("Ugyldigt valg. Prøv igen.")
 
+def discover_competitors(analyzer):
+    top_n = input("Antal kandidater at vise (standard 10): ").strip()
+    top_n = int(top_n) if top_n.isdigit() else 10
+    
+    discovery = CompetitorDiscovery(analyzer)
+    ranked = discovery.discover(top_n)
+    if not ranked:
+        print("Ingen kandidater fundet")
+        return
+    
+    discovery.print_ranking(ranked)
+    
+    selection = input("\nTilføj kandidater (f.eks. 1,3 eller 'alle', Enter for ingen): ").strip()
+    if selection.lower() == 'alle':
+        discovery.apply(ranked)
+    elif selection:
+        numbers = [s.strip() for s in selection.split(',')]
+        selected = [ranked[int(n) - 1] for n in numbers if n.isdigit() and 0 < int(n) <= len(ranked)]
+        if selected:
+            discovery.apply(selected)
+        else:
+            print("Ingen gyldige kandidater valgt")
+
 def manage_treatment_keywords(analyzer):
     while True:
         print("\n" + "-"*40)
@@ -116,12 +145,8 @@ def select_treatment_categories(analyzer):
     print("-"*40)
     
     categories = {
-        '1': ('Permanent hårfjerning', ['permanent hårfjerning', 'hårfjerning', 'laser hårfjerning', 'ipl hårfjerning', 'diode laser', 'alexandrite laser', 'epilering', 'hår fjernelse']),
-        '2': ('Botox', ['botox', 'botulinum', 'rynkebehandling', 'panderynker', 'kragerødder', 'sveden']),
-        '3': ('Filler', ['filler', 'hyaluronsyre', 'læbefiller', 'kindben', 'næsefiller', 'hageforstørrelse']),
-        '4': ('Karsprængninger', ['karsprængninger', 'åreknuder', 'blodsprængninger', 'kapillarer', 'couperose', 'rosacea', 'blodkar', 'vaskulære læsioner']),
-        '5': ('Pigmentforandringer', ['pigmentforandringer', 'pigmentpletter', 'aldersletter', 'solskader', 'melasma', 'hyperpigmentering', 'misfarvning', 'brune pletter']),
-        '6': ('CO2 laser', ['co2 laser', 'fraktionel laser', 'hudfornyelse', 'laser resurfacing', 'ar behandling', 'porereduktion', 'hudstramning', 'laser peeling'])
+        str(i): (name, keywords)
+        for i, (name, keywords) in enumerate(analyzer.treatment_categories.items(), 1)
     }
     
     for key, (name, keywords) in categories.items():
@@ -163,9 +188,10 @@ def show_settings(analyzer):
     print("-"*40)
     print("1. Slå keyword filtrering til/fra")
     print("2. Vis API status")
-    print("3. Tilbage til hovedmenu")
+    print("3. Keyword udvidelse (keyword ideer)")
+    print("4. Tilbage til hovedmenu")
     
-    choice = input("\nVælg (1-3): ").strip()
+    choice = input("\nVælg (1-4): ").strip()
     
     if choice == '1':
         status = analyzer.toggle_keyword_filtering()
@@ -174,6 +200,17 @@ def show_settings(analyzer):
         print("API credentials loaded fra .env fil")
         print(f"Target domain: {analyzer.target_domain}")
     elif choice == '3':
+        print(f"Nuværende: {analyzer.keyword_expansion or 'fra'}")
+        print("1. Fra")
+        print("2. Brug behandlingstyper som seeds")
+        print("3. Brug top gaps som seeds")
+        seed_choice = input("\nVælg (1-3): ").strip()
+        seed_sources = {'1': None, '2': 'treatments', '3': 'gaps'}
+        if seed_choice in seed_sources:
+            analyzer.set_keyword_expansion(seed_sources[seed_choice])
+        else:
+            print("Ugyldigt valg")
+    elif choice == '4':
         return
     else:
         print("Ugyldigt valg")
@@ -186,12 +223,21 @@ def show_status(analyzer):
     print(f"🔧 Keyword filtrering: {'ON' if analyzer.filter_keywords else 'OFF'}")
     print(f"👥 Antal konkurrenter: {len(analyzer.competitors)}")
     print(f"🎯 Antal treatment keywords: {len(analyzer.treatment_keywords)}")
+    print(f"💡 Keyword udvidelse: {analyzer.keyword_expansion or 'fra'}")
     print(f"💾 Settings fil: {analyzer.settings_file}")
     
     print(f"\nKonkurrenter:")
     for i, comp in enumerate(analyzer.competitors, 1):
         print(f"  {i}. {comp}")
     
+    # Snapshots are memory-mapped, so the gap overview of the stored data is instant
+    stored_gaps = analyzer.snapshot_gaps() if analyzer.load_snapshot(analyzer.target_domain) else {}
+    if stored_gaps:
+        total_gaps = sum(len(gaps) for gaps in stored_gaps.values())
+        print(f"\n📦 Gemte data: {total_gaps} content gaps fra {len(stored_gaps)} konkurrenter")
+        for competitor, gaps in stored_gaps.items():
+            print(f"  {competitor}: {len(gaps)} gaps")
+    
     if analyzer.filter_keywords:
         print(f"\nKeyword filtrering aktiv - {len(analyzer.treatment_keywords)} behandlingstermer")
     else:
@@ -233,7 +279,7 @@ def main():
     
     while True:
         show_main_menu()
-        choice = input("\nVælg (1-7): ").strip()
+        choice = input("\nVælg (1-8): ").strip()
         
         if choice == '1':
             manage_competitors(analyzer)
@@ -252,15 +298,29 @@ def main():
             try:
                 results = analyzer.analyze_content_gap()
                 filename = 'content_gap_analysis.xlsx'
-                analyzer.export_to_excel(results, filename)
-                print(f"\n✅ Analyse færdig! Check '{filename}' filen.")
+                if analyzer.export_to_excel(results, filename):
+                    print(f"\n✅ Analyse færdig! Check '{filename}' filen.")
+                else:
+                    print(f"\n❌ Ingen data for {analyzer.target_domain} - '{filename}' er ikke ændret.")
             except Exception as e:
                 print(f"❌ Fejl under analyse: {e}")
                 
         elif choice == '6':
+            print("\n♻️  Genberegner fra gemte data...")
+            try:
+                results = analyzer.apply_changes()
+                filename = 'content_gap_analysis.xlsx'
+                if analyzer.export_to_excel(results, filename):
+                    print(f"\n✅ Opdateret! Check '{filename}' filen.")
+                else:
+                    print(f"\n❌ Ingen gemte data for {analyzer.target_domain} - '{filename}' er ikke ændret.")
+            except Exception as e:
+                print(f"❌ Fejl under genberegning: {e}")
+                
+        elif choice == '7':
             show_status(analyzer)
             
-        elif choice == '7':
+        elif choice == '8':
             print("\n👋 Farvel!")
             break
             
@@ -0,0 +1,197 @@
+import json
+import math
+import os
+import time
+
+from keyword_normalization import normalize_keyword
+from config import Config
+
+KEYWORD_IDEAS_SOURCE = 'keyword_ideas'
+
+
+class KeywordExpander:
+    """Expands content gaps with keyword ideas from seed keywords, caching expanded seeds on disk"""
+
+    def __init__(self, analyzer, cache_file=None):
+        self.analyzer = analyzer
+        market_suffix = f"_{analyzer.market}" if analyzer.market else ''
+        self.cache_file = cache_file or f"keyword_ideas_cache{market_suffix}.json"
+        self.cache = self._load_cache()
+
+    def expand(self, results, seeds):
+        """Add keyword idea gaps for the given seeds (see select_seeds) to the results under their own source"""
+        if not seeds:
+            return results
+
+        ideas = self.get_ideas(seeds)
+
+        # Dedupe against everything the target ranks for, not just the filtered keywords
+        known = set()
+        target_raw = self.analyzer._get_raw_domain_keywords(self.analyzer.target_domain)
+        for item in target_raw or []:
+            for kw_item in (item or {}).get('items') or []:
+                keyword = (kw_item or {}).get('keyword_data', {}).get('keyword')
+                if keyword:
+                    known.add(normalize_keyword(keyword))
+        for gap_keywords in results['content_gaps'].values():
+            known.update(normalize_keyword(gap['keyword']) for gap in gap_keywords if isinstance(gap, dict))
+
+        idea_gaps = []
+        for idea in ideas:
+            keyword = idea.get('keyword')
+            if not keyword or normalize_keyword(keyword) in known:
+                continue
+            categories = self.analyzer._keyword_categories(keyword)
+            if self.analyzer.filter_keywords and not categories:
+                continue
+            known.add(normalize_keyword(keyword))
+            keyword_info = idea.get('keyword_info') or {}
+            idea_gaps.append({
+                'keyword': keyword,
+                'search_volume': keyword_info.get('search_volume', 0),
+                'competition': keyword_info.get('competition', 0),
+                'competition_level': keyword_info.get('competition_level', ''),
+                'cpc': keyword_info.get('cpc', 0),
+                'competitor_rank': '',
+                'competitor_url': '',
+                'categories': categories,
+                'source': KEYWORD_IDEAS_SOURCE
+            })
+
+        print(f"  Keyword ideer: {len(idea_gaps)} nye gaps fra {len(seeds)} seeds")
+        results['content_gaps'][KEYWORD_IDEAS_SOURCE] = idea_gaps
+        return results
+
+    def get_ideas(self, seeds):
+        """Return keyword ideas for the seeds, only calling the API for seeds not expanded recently"""
+        now = time.time()
+        fresh_batches = set()
+        missing = []
+        for seed in dict.fromkeys(seed.lower() for seed in seeds):
+            batch_id = self.cache['seeds'].get(seed)
+            batch = self.cache['batches'].get(batch_id)
+            if batch and now - batch['fetched_at'] < Config.KEYWORD_IDEAS_CACHE_TTL:
+                fresh_batches.add(batch_id)
+            elif not self.analyzer.offline:
+                missing.append(seed)
+
+        limit = Config.KEYWORD_IDEAS_SEED_LIMIT
+        for start in range(0, len(missing), limit):
+            batch_seeds = missing[start:start + limit]
+            items = self._fetch_ideas(batch_seeds)
+            if items is None:
+                continue
+            batch_id = str(self.cache['next_batch_id'])
+            self.cache['next_batch_id'] += 1
+            self.cache['batches'][batch_id] = {'fetched_at': now, 'seeds': batch_seeds, 'ideas': items}
+            for seed in batch_seeds:
+                self.cache['seeds'][seed] = batch_id
+            fresh_batches.add(batch_id)
+
+        if missing:
+            self._prune_cache()
+            self._save_cache()
+
+        ideas = {}
+        for batch_id in fresh_batches:
+            for idea in self.cache['batches'][batch_id]['ideas']:
+                if idea.get('keyword'):
+                    ideas.setdefault(idea['keyword'], idea)
+        return list(ideas.values())
+
+    def estimate(self, seeds):
+        """Estimated calls and cost of fetching ideas for the seeds that are not cached"""
+        if self.analyzer.offline:
+            return self.batch_cost(0)
+        now = time.time()
+        missing = 0
+        for seed in dict.fromkeys(seed.lower() for seed in seeds):
+            batch = self.cache['batches'].get(self.cache['seeds'].get(seed))
+            if not (batch and now - batch['fetched_at'] < Config.KEYWORD_IDEAS_CACHE_TTL):
+                missing += 1
+        return self.batch_cost(missing)
+    
+    def batch_cost(self, seed_count):
+        """Estimated calls and cost of expanding a number of uncached seeds"""
+        calls = math.ceil(seed_count / Config.KEYWORD_IDEAS_SEED_LIMIT)
+        items = calls * Config.KEYWORD_IDEAS_LIMIT
+        return {
+            'calls': calls,
+            'items': items,
+            'cost': round(calls * Config.COST_PER_REQUEST + items * Config.COST_PER_ITEM, 4),
+            'cached': calls == 0
+        }
+    
+    def _fetch_ideas(self, seeds):
+        """Fetch one batch of keyword ideas, keeping only the fields the gap output needs"""
+        try:
+            response = self.analyzer.client.get_keyword_ideas(
+                seeds, limit=Config.KEYWORD_IDEAS_LIMIT,
+                location_code=self.analyzer.location_code, language_code=self.analyzer.language_code
+            )
+        except Exception as e:
+            print(f"Exception getting keyword ideas: {e}")
+            return None
+
+        if response.get('status_code') != 20000:
+            print(f"Error getting keyword ideas: {response.get('status_message')}")
+            return None
+
+        items = []
+        for task in response.get('tasks') or []:
+            for result in task.get('result') or []:
+                for item in result.get('items') or []:
+                    if item and item.get('keyword'):
+                        items.append({'keyword': item['keyword'], 'keyword_info': item.get('keyword_info') or {}})
+        return items
+
+    def select_seeds(self, results, seed_source='treatments', top_n=50):
+        """Pick seeds from the treatment keywords or the highest priority gaps"""
+        if seed_source == 'treatments':
+            return list(self.analyzer.treatment_keywords)
+
+        if seed_source == 'gaps':
+            scored = [
+                self.analyzer.score_gap(gap)
+                for source, gap_keywords in results['content_gaps'].items()
+                if source != KEYWORD_IDEAS_SOURCE
+                for gap in gap_keywords
+                if isinstance(gap, dict)
+            ]
+            scored.sort(key=lambda gap: (gap['priority_score'], gap.get('search_volume') or 0), reverse=True)
+            return list(dict.fromkeys(gap['keyword'] for gap in scored))[:top_n]
+
+        print(f"Ukendt seed kilde: {seed_source}")
+        return []
+
+    def _prune_cache(self):
+        """Drop expired batches and the seeds pointing at them"""
+        now = time.time()
+        expired = {
+            batch_id for batch_id, batch in self.cache['batches'].items()
+            if now - batch['fetched_at'] >= Config.KEYWORD_IDEAS_CACHE_TTL
+        }
+        for batch_id in expired:
+            del self.cache['batches'][batch_id]
+        self.cache['seeds'] = {
+            seed: batch_id for seed, batch_id in self.cache['seeds'].items()
+            if batch_id in self.cache['batches']
+        }
+
+    def _load_cache(self):
+        """Load the seed cache from disk"""
+        try:
+            if os.path.exists(self.cache_file):
+                with open(self.cache_file, 'r', encoding='utf-8') as f:
+                    return json.load(f)
+        except Exception as e:
+            print(f"Fejl ved indlæsning af keyword idé cache: {e}")
+        return {'next_batch_id': 1, 'seeds': {}, 'batches': {}}
+
+    def _save_cache(self):
+        """Save the seed cache to disk"""
+        try:
+            with open(self.cache_file, 'w', encoding='utf-8') as f:
+                json.dump(self.cache, f, ensure_ascii=False)
+        except Exception as e:
+            print(f"Fejl ved gemning af keyword idé cache: {e}")
@@ -0,0 +1,15 @@
+import re
+import unicodedata
+from functools import lru_cache
+
+from config import Config
+
+_SEPARATORS = re.compile(r'[\W_]+')
+
+
+@lru_cache(maxsize=Config.KEYWORD_NORMALIZE_CACHE_SIZE)
+def normalize_keyword(keyword):
+    """Canonical matching key for a Danish keyword ("Botox-pris" and "botox  pris?" share one key)"""
+    # Casefold, write "aa" as "å" and collapse hyphens, punctuation and whitespace into single spaces
+    key = unicodedata.normalize('NFKC', keyword or '').casefold().replace('aa', 'å')
+    return _SEPARATORS.sub(' ', key).strip()
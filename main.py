@@ -1,15 +1,60 @@
 #!/usr/bin/env python3
 
+import argparse
+
 from content_gap_analyzer import ContentGapAnalyzer
 
+def print_preview(analyzer, results, top_n=10):
+    """Print the highest priority gaps of a preview run"""
+    gaps_df = analyzer._gaps_dataframe(results)
+    print(f"\nPREVIEW - top {top_n} foreløbige gaps (tal kan ændre sig når den fulde analyse er færdig):")
+    for _, gap in gaps_df.head(top_n).iterrows():
+        print(f"  {gap['Missing_Keyword']} ({gap['Competitor']}) - volumen {gap['Search_Volume']}, "
+              f"score {gap['Priority_Score']} {gap['Priority_Level']}")
+    print()
+
 def main():
+    parser = argparse.ArgumentParser(description="Run content gap analysis")
+    parser.add_argument('--apply-changes', action='store_true',
+                        help="Re-run filtering, gaps and scoring on the last fetched data without API calls")
+    parser.add_argument('--columnar', metavar='DIR',
+                        help="Also write Parquet/CSV tables to DIR; the Excel file then only holds the summary sheets and top gaps")
+    parser.add_argument('--no-excel', action='store_true', help="Skip the Excel workbook")
+    parser.add_argument('--dry-run', action='store_true',
+                        help="Only estimate the API calls and cost of the analysis")
+    parser.add_argument('--preview', action='store_true',
+                        help="Show approximate gaps from a small slice per domain first, then finish the full run")
+    parser.add_argument('--budget', type=float, help="Stop fetching new domains when this many USD are spent")
+    args = parser.parse_args()
+    
     analyzer = ContentGapAnalyzer()
+    if args.budget is not None:
+        analyzer.budget = args.budget
+    
+    if args.dry_run:
+        analyzer.estimate_run()
+        return
     
     print("Starting content gap analysis for cosmolaser.dk...")
     
     try:
-        results = analyzer.analyze_content_gap()
-        analyzer.export_to_excel(results)
+        if args.apply_changes:
+            results = analyzer.apply_changes()
+        elif args.preview:
+            results, full_run = analyzer.analyze_preview()
+            print_preview(analyzer, results)
+            full_run.result()
+        else:
+            results = analyzer.analyze_content_gap()
+        
+        if results.get('target_missing'):
+            print(f"\nNo data for {analyzer.target_domain} - nothing exported.")
+            return
+        
+        if args.columnar:
+            analyzer.export_dataset(results, args.columnar)
+        if not args.no_excel:
+            analyzer.export_to_excel(results, summary_only=bool(args.columnar))
         
         print("\nAnalysis completed successfully!")
         print("Check the 'content_gap_analysis.xlsx' file for detailed results.")
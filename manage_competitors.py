@@ -55,5 +55,5 @@ if __name__ == "__main__":
     if run_analysis in ['y', 'yes', 'ja']:
         print("Starter analyse...")
         results = analyzer.analyze_content_gap()
-        analyzer.export_to_excel(results)
-        print("Analyse færdig!")
\ No newline at end of file
+        if analyzer.export_to_excel(results):
+            print("Analyse færdig!")
\ No newline at end of file
@@ -0,0 +1,166 @@
+#!/usr/bin/env python3
+
+import argparse
+import copy
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pandas as pd
+
+from content_gap_analyzer import ContentGapAnalyzer, canonical_domain, canonical_domains
+from config import Config
+
+
+class MarketMatrix:
+    """Runs the content gap analysis for several markets at once over one shared, rate-limited client"""
+
+    def __init__(self, analyzer=None, markets=None):
+        self.analyzer = analyzer or ContentGapAnalyzer()
+        self.markets = markets or list(Config.MARKETS)
+
+    def market_analyzer(self, market):
+        """Create an analyzer for one market profile, sharing the base analyzer's client"""
+        profile = Config.MARKETS[market]
+        analyzer = copy.copy(self.analyzer)
+        analyzer.market = market
+        analyzer.location_code = profile['location_code']
+        analyzer.language_code = profile['language_code']
+        analyzer.competitors = list(self.analyzer.competitors)
+        analyzer.preview_pages = {}
+
+        if market == Config.DEFAULT_MARKET:
+            # The default market keeps the normal cache, stored data and history
+            analyzer.raw_cache = self.analyzer.raw_cache
+        else:
+            analyzer.raw_cache = {}
+            analyzer.raw_data_dir = os.path.join(self.analyzer.raw_data_dir, market)
+            analyzer.record_history = False
+
+        if profile.get('treatment_categories'):
+            analyzer.treatment_categories = {
+                name: list(keywords) for name, keywords in profile['treatment_categories'].items()
+            }
+            analyzer.treatment_keywords = [
+                kw for keywords in analyzer.treatment_categories.values() for kw in keywords
+            ]
+        return analyzer
+
+    def run(self):
+        """Fetch every domain x market combination concurrently, then analyze each market"""
+        analyzers = {market: self.market_analyzer(market) for market in self.markets}
+        client = self.analyzer.client
+        run_id = client.new_run()
+        jobs = self.prefetch_jobs(analyzers)
+
+        def prefetch(job):
+            with client.cost_run(run_id):
+                return job[0]._get_raw_domain_keywords(job[1])
+
+        print(f"Henter {len(jobs)} domæne/marked kombinationer for {len(analyzers)} markeder")
+        start = time.time()
+        with ThreadPoolExecutor(max_workers=Config.MAX_CONCURRENT_REQUESTS) as executor:
+            list(executor.map(prefetch, jobs))
+        print(f"Data hentet på {time.time() - start:.1f} sekunder")
+
+        # Prefetched domains are cached, so the per-market analyses only fetch what the budget still allows;
+        # sharing the run id makes every market's budget check see the whole matrix spend
+        results_by_market = {}
+        for market, analyzer in analyzers.items():
+            print(f"\n[{market}] {Config.MARKETS[market]['name']}")
+            results_by_market[market] = analyzer.analyze_content_gap(run_id, start)
+        return results_by_market
+
+    def prefetch_jobs(self, analyzers):
+        """(analyzer, domain) fetches ordered targets first, then competitors by value, cut off at the budget"""
+        queues = []
+        for analyzer in analyzers.values():
+            target = canonical_domain(analyzer.target_domain)
+            competitors = [domain for domain in canonical_domains(analyzer.competitors) if domain != target]
+            queues.append([(analyzer, target)] + [(analyzer, domain) for domain in analyzer._fetch_order(competitors)])
+
+        # Interleave the markets so each market's most valuable domains come before any market's least valuable
+        jobs = [queue[i] for i in range(max(map(len, queues), default=0)) for queue in queues if i < len(queue)]
+        if self.analyzer.budget is None:
+            return jobs
+
+        planned = 0
+        for i, (analyzer, domain) in enumerate(jobs):
+            planned += analyzer._estimate_domain(domain)['cost']
+            if planned > self.analyzer.budget:
+                print(f"Budget på ${self.analyzer.budget:.4f} rækker til {i} af {len(jobs)} hentninger")
+                return jobs[:i]
+        return jobs
+
+    def cross_market_summary(self, results_by_market):
+        """Compare gap counts, volume and high-priority gaps per market and competitor"""
+        gaps_df = self._all_gaps(results_by_market)
+        if gaps_df.empty:
+            return gaps_df
+
+        gaps_df['High_Priority'] = gaps_df['Priority_Level'] == 'HØJ'
+        summary = gaps_df.groupby(['Market', 'Competitor'], sort=False).agg(
+            Gap_Count=('Missing_Keyword', 'size'),
+            Total_Search_Volume=('Search_Volume', 'sum'),
+            High_Priority_Gaps=('High_Priority', 'sum'),
+            Avg_Priority_Score=('Priority_Score', 'mean')
+        )
+        summary['Avg_Priority_Score'] = summary['Avg_Priority_Score'].round(2)
+        return summary.reset_index()
+
+    def cross_market_categories(self, results_by_market):
+        """Gap search volume per treatment category, one column per market"""
+        gaps_df = self._all_gaps(results_by_market)
+        if gaps_df.empty:
+            return gaps_df
+
+        exploded = gaps_df.explode('Categories').dropna(subset=['Categories'])
+        pivot = exploded.pivot_table(
+            index='Categories', columns='Market', values='Search_Volume', aggfunc='sum', fill_value=0
+        )
+        return pivot.rename_axis(columns=None).reset_index().rename(columns={'Categories': 'Category'})
+
+    def export_to_excel(self, results_by_market, filename='market_matrix_analysis.xlsx'):
+        """Export per-market gaps and the cross-market comparison"""
+        with pd.ExcelWriter(filename, engine='openpyxl') as writer:
+            summary_df = self.cross_market_summary(results_by_market)
+            if not summary_df.empty:
+                summary_df.to_excel(writer, sheet_name='Cross_Market', index=False)
+
+            categories_df = self.cross_market_categories(results_by_market)
+            if not categories_df.empty:
+                categories_df.to_excel(writer, sheet_name='Cross_Market_Categories', index=False)
+
+            for market, results in results_by_market.items():
+                gaps_df = self.analyzer._gaps_dataframe(results)
+                if not gaps_df.empty:
+                    gaps_df = gaps_df.assign(Categories=gaps_df['Categories'].str.join(', '))
+                    gaps_df.to_excel(writer, sheet_name=f'Gaps_{market}'[:31], index=False)
+
+        print(f"Results exported to {filename}")
+
+    def _all_gaps(self, results_by_market):
+        frames = [
+            self.analyzer._gaps_dataframe(results).assign(Market=market)
+            for market, results in results_by_market.items()
+        ]
+        frames = [frame for frame in frames if not frame.empty]
+        return pd.concat(frames, ignore_index=True) if frames else pd.DataFrame()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run the content gap analysis across several markets")
+    parser.add_argument('--markets', nargs='+', choices=list(Config.MARKETS), default=list(Config.MARKETS))
+    parser.add_argument('--output', default='market_matrix_analysis.xlsx')
+    parser.add_argument('--budget', type=float, help="Maximum USD spend across all markets")
+    args = parser.parse_args()
+
+    matrix = MarketMatrix(markets=args.markets)
+    if args.budget is not None:
+        matrix.analyzer.budget = args.budget
+    results_by_market = matrix.run()
+    matrix.export_to_excel(results_by_market, args.output)
+
+
+if __name__ == "__main__":
+    main()
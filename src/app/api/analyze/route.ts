@@ -1,5 +1,6 @@
 import { NextRequest, NextResponse } from 'next/server';
 import { Settings } from '@/app/page';
+import { analysisServiceEnabled, proxyToAnalysisService } from '@/lib/analysis-service';
 
 // --- DataForSEO Client (TypeScript Version) ---
 class DataForSEOClient {
@@ -96,6 +97,12 @@ function findContentGaps(targetKeywords: any[], competitorData: { [key: string]:
 export async function POST(request: NextRequest) {
   try {
     const settings: Settings = await request.json();
+
+    // The Python service owns matching, normalization and scoring when it is configured
+    if (analysisServiceEnabled()) {
+      return proxyToAnalysisService('/api/analyze', settings);
+    }
+
     const { target_domain, competitors, treatment_categories, filter_keywords } = settings;
 
     if (!target_domain || !competitors || competitors.length === 0) {
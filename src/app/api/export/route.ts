@@ -2,7 +2,7 @@ import { NextRequest, NextResponse } from 'next/server';
 import ExcelJS from 'exceljs';
 import { AnalysisResults } from '@/app/page';
 
-// --- Priority Score Logic (ported from Python) ---
+// --- Priority Score Logic (ported from Python, only used when the gaps were not scored by the analysis service) ---
 function calculatePriorityScore(search_volume = 0, competition = 0, cpc = 0) {
   let volume_score = 0;
   if (search_volume >= 500) volume_score = 5;
@@ -52,11 +52,9 @@ export async function POST(request: NextRequest) {
     let gapsData: any[] = [];
     for (const [competitor, gap_keywords] of Object.entries(results.content_gaps)) {
       for (const gap_item of gap_keywords as any[]) {
-        const { priority_score, priority_level } = calculatePriorityScore(
-            gap_item.search_volume,
-            gap_item.competition,
-            gap_item.cpc
-        );
+        const { priority_score, priority_level } = gap_item.priority_level
+          ? gap_item
+          : calculatePriorityScore(gap_item.search_volume, gap_item.competition, gap_item.cpc);
         gapsData.push({ ...gap_item, competitor, priority_score, priority_level });
       }
     }
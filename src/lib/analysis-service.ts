@@ -0,0 +1,22 @@
+import { NextResponse } from 'next/server';
+
+// Base URL of the Python analysis service (analysis_server.py); unset means the routes run their own logic
+const ANALYSIS_SERVICE_URL = process.env.ANALYSIS_SERVICE_URL?.replace(/\/+$/, '') || '';
+
+export function analysisServiceEnabled() {
+  return Boolean(ANALYSIS_SERVICE_URL);
+}
+
+// Forward a JSON request body to the analysis service and pass its response through unchanged
+export async function proxyToAnalysisService(path: string, body: unknown) {
+  const response = await fetch(`${ANALYSIS_SERVICE_URL}${path}`, {
+    method: 'POST',
+    headers: { 'Content-Type': 'application/json' },
+    body: JSON.stringify(body)
+  });
+
+  return new NextResponse(response.body, {
+    status: response.status,
+    headers: { 'Content-Type': response.headers.get('Content-Type') || 'application/json' }
+  });
+}
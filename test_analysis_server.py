@@ -0,0 +1,79 @@
+import json
+import threading
+import time
+import urllib.error
+import urllib.request
+from http.server import ThreadingHTTPServer
+
+from analysis_server import AnalysisRequestHandler, AnalysisService
+
+
+def test_requests_differing_only_in_expansion_do_not_share_a_run(analyzer):
+    service = AnalysisService(analyzer)
+    keys = {
+        service._analysis_key(service._make_analyzer({'keyword_expansion': expansion}))
+        for expansion in (None, 'treatments', 'gaps')
+    }
+    assert len(keys) == 3
+
+
+def test_identical_concurrent_requests_share_one_run(analyzer, monkeypatch):
+    service = AnalysisService(analyzer)
+    started = threading.Event()
+    release = threading.Event()
+    runs = []
+
+    def slow_analysis(self, run_id=None):
+        runs.append(self)
+        started.set()
+        release.wait(5)
+        return {'content_gaps': {}}
+
+    monkeypatch.setattr(type(analyzer), 'analyze_content_gap', slow_analysis)
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(service.analyze({}))) for _ in range(3)]
+    threads[0].start()
+    started.wait(5)
+    for thread in threads[1:]:
+        thread.start()
+    time.sleep(0.2)  # let the followers find the in-flight run
+    release.set()
+    for thread in threads:
+        thread.join(5)
+
+    assert len(runs) == 1
+    assert len(results) == 3 and all(result is results[0] for result in results)
+
+
+def request(server, method, path, body=None, content_type=None):
+    headers = {'Content-Type': content_type} if content_type else {}
+    req = urllib.request.Request(
+        f"http://127.0.0.1:{server.server_port}{path}", data=body, headers=headers, method=method
+    )
+    try:
+        with urllib.request.urlopen(req) as response:
+            return response.status, response.headers
+    except urllib.error.HTTPError as e:
+        return e.code, e.headers
+
+
+def test_service_refuses_browser_style_requests(analyzer, monkeypatch):
+    calls = []
+    monkeypatch.setattr(AnalysisService, 'analyze_json', lambda self, payload=None: calls.append(payload) or {})
+    handler = type('TestHandler', (AnalysisRequestHandler,), {'service': AnalysisService(analyzer)})
+    handler.log_message = lambda self, *args: None
+    server = ThreadingHTTPServer(('127.0.0.1', 0), handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    try:
+        body = json.dumps({}).encode('utf-8')
+        status, headers = request(server, 'OPTIONS', '/api/analyze')
+        assert status >= 400 and 'Access-Control-Allow-Origin' not in headers
+        assert request(server, 'POST', '/api/analyze', body, 'text/plain')[0] == 415
+        assert calls == []
+
+        status, headers = request(server, 'POST', '/api/analyze', body, 'application/json')
+        assert status == 200 and 'Access-Control-Allow-Origin' not in headers
+        assert calls == [{}]
+    finally:
+        server.shutdown()
+        server.server_close()
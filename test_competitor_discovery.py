@@ -0,0 +1,59 @@
+from competitor_discovery import CompetitorDiscovery
+from config import Config
+from conftest import kw_item
+
+
+def competitors_response(items):
+    return {'status_code': 20000, 'cost': 0.01, 'tasks': [{'result': [{'items': items}]}]}
+
+
+def candidate(domain, intersections, etv):
+    return {'domain': domain, 'intersections': intersections, 'metrics': {'organic': {'etv': etv}}}
+
+
+def make_discovery(analyzer, client, monkeypatch, fetch_limit=2):
+    analyzer.competitors = []
+    client.data['skønhed.dk'] = [kw_item('botox pris', 1), kw_item('filler læber', 2)]
+    client.data['small.dk'] = [kw_item('botox pris', 3)]
+    monkeypatch.setattr(client, 'get_competitors_keywords', lambda domain, **kwargs: competitors_response([
+        candidate('cosmolaser.dk', 50, 900),
+        candidate('small.dk', 1, 10),
+        candidate('www.nage.dk', 5, 100),
+        candidate('skønhed.dk', 5, 400),
+        candidate('nygart.dk', 2, 5000)
+    ]))
+    return CompetitorDiscovery(analyzer, fetch_limit=fetch_limit)
+
+
+def test_candidates_are_ranked_by_competitors_domain_metrics(analyzer, client, monkeypatch):
+    discovery = make_discovery(analyzer, client, monkeypatch)
+    assert discovery.get_candidates() == ['skønhed.dk', 'nage.dk', 'nygart.dk', 'small.dk']
+
+
+def test_only_top_candidates_are_fetched_and_nothing_is_stored(analyzer, client, monkeypatch, tmp_path):
+    discovery = make_discovery(analyzer, client, monkeypatch)
+    ranked = discovery.discover(top_n=5)
+
+    assert {target for target, _, _ in client.sent} == {'cosmolaser.dk', 'skønhed.dk', 'nage.dk'}
+    assert [row['domain'] for row in ranked] == ['nage.dk', 'skønhed.dk']
+    assert ranked[0]['overlap'] == 2
+    stored = sorted(path.name for path in (tmp_path / 'raw_data').iterdir())
+    assert all(name.startswith('cosmolaser.dk') for name in stored)
+
+
+def test_budget_limits_candidate_fetches(analyzer, client, monkeypatch):
+    monkeypatch.setattr(Config, 'COST_PER_REQUEST', 0.01)
+    monkeypatch.setattr(Config, 'COST_PER_ITEM', 0)
+    discovery = make_discovery(analyzer, client, monkeypatch, fetch_limit=4)
+    analyzer.budget = 0.025
+    discovery.discover()
+
+    assert {target for target, _, _ in client.sent} == {'cosmolaser.dk', 'skønhed.dk'}
+
+
+def test_estimate_does_not_call_the_api(analyzer, client, monkeypatch):
+    discovery = make_discovery(analyzer, client, monkeypatch)
+    estimate = discovery.estimate()
+
+    assert client.sent == []
+    assert estimate['calls'] == 1 + 1 + 2 * Config.RANKED_KEYWORDS_MAX_PAGES
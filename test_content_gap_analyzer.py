@@ -0,0 +1,33 @@
+import os
+
+
+def test_failed_target_fetch_gives_no_gaps_and_no_export(analyzer, client):
+    client.failing.add('cosmolaser.dk')
+
+    results = analyzer.analyze_content_gap()
+
+    assert results['target_missing']
+    assert results['content_gaps'] == {}
+    assert results['competitor_data']['nage.dk']
+    assert analyzer.export_to_excel(results, 'content_gap_analysis.xlsx') is False
+    assert not os.path.exists('content_gap_analysis.xlsx')
+
+
+def test_apply_changes_without_stored_target_gives_no_gaps(analyzer):
+    analyzer._get_raw_domain_keywords('nage.dk')
+    analyzer.raw_cache.clear()
+
+    results = analyzer.apply_changes()
+
+    assert results['target_missing']
+    assert results['content_gaps'] == {}
+    assert analyzer.export_dataset(results, 'dataset') is None
+    assert not os.path.exists('dataset')
+
+
+def test_target_with_data_is_exported(analyzer):
+    results = analyzer.analyze_content_gap()
+
+    assert not results['target_missing']
+    assert analyzer.export_to_excel(results, 'content_gap_analysis.xlsx')
+    assert os.path.exists('content_gap_analysis.xlsx')
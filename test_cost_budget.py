@@ -0,0 +1,85 @@
+import threading
+import time
+
+from config import Config
+
+
+def test_run_report_counts_only_its_own_requests(analyzer, client, monkeypatch):
+    other_run = client.new_run()
+    send_request = client._send_request
+
+    def other_request():
+        with client.cost_run(other_run):
+            client.get_domain_keywords('other.dk')
+
+    def send_with_concurrent_request(endpoint, data=None):
+        # Another service request hits the shared client while this run is in progress
+        if data[0]['target'] == 'nage.dk':
+            thread = threading.Thread(target=other_request)
+            thread.start()
+            thread.join()
+        return send_request(endpoint, data)
+
+    monkeypatch.setattr(client, '_send_request', send_with_concurrent_request)
+    results = analyzer.analyze_content_gap()
+
+    report = results['run_report']
+    assert [entry['domain'] for entry in report['requests']] == ['cosmolaser.dk', 'nage.dk', 'nygart.dk']
+    assert report['total_cost'] == 0.03
+    assert [entry['domain'] for entry in client.cost_entries(other_run)] == ['other.dk']
+
+
+def test_memoized_requests_are_logged_at_zero_cost(analyzer):
+    analyzer.analyze_content_gap()
+    analyzer.clear_cache()
+
+    report = analyzer.analyze_content_gap()['run_report']
+
+    assert report['total_cost'] == 0
+    assert all(entry['reused'] for entry in report['requests'])
+
+
+def test_estimate_counts_only_uncached_domains(analyzer):
+    assert analyzer.estimate_run()['calls'] == 3
+
+    analyzer._get_raw_domain_keywords('nage.dk')
+    estimate = analyzer.estimate_run()
+
+    assert estimate['calls'] == 2
+    assert [row['domain'] for row in estimate['rows'] if row['cached']] == ['nage.dk']
+
+
+def test_budget_fetches_most_valuable_competitors_first(analyzer, client):
+    # Stored data from an earlier run ranks nygart.dk (600 volume) below nage.dk (950)
+    for domain in ('nage.dk', 'nygart.dk'):
+        analyzer._get_raw_domain_keywords(domain)
+    analyzer.clear_cache()
+    client.clear_responses()
+    assert analyzer._fetch_order(['nygart.dk', 'nage.dk']) == ['nygart.dk', 'nage.dk']
+
+    analyzer.budget = 1.0
+    assert analyzer._fetch_order(['nygart.dk', 'nage.dk']) == ['nage.dk', 'nygart.dk']
+
+
+def test_budget_stops_cleanly_and_reports_skipped_domains(analyzer, client, monkeypatch):
+    monkeypatch.setattr(Config, 'COST_PER_ITEM', 0)
+    analyzer.budget = 0.025
+
+    results = analyzer.analyze_content_gap()
+
+    assert [target for target, _, _ in client.sent] == ['cosmolaser.dk', 'nage.dk']
+    assert results['run_report']['skipped'] == ['nygart.dk']
+    assert list(results['competitor_data']) == ['nage.dk']
+
+
+def test_cached_domains_are_used_after_the_budget_is_reached(analyzer, client, monkeypatch):
+    monkeypatch.setattr(Config, 'COST_PER_ITEM', 0)
+    analyzer.raw_cache['nygart.dk'] = (time.time(), client.get_domain_keywords('nygart.dk')['tasks'][0]['result'])
+    client.sent.clear()
+    analyzer.budget = 0.015
+
+    results = analyzer.analyze_content_gap()
+
+    assert [target for target, _, _ in client.sent] == ['cosmolaser.dk']
+    assert results['run_report']['skipped'] == ['nage.dk']
+    assert list(results['competitor_data']) == ['nygart.dk']
@@ -0,0 +1,73 @@
+import threading
+import time
+
+from config import Config
+from conftest import FakeClient, kw_item
+
+
+def make_client():
+    return FakeClient({'nage.dk': [kw_item('botox pris', 2)], 'nygart.dk': [kw_item('filler', 1)]})
+
+
+def test_identical_concurrent_requests_share_one_call(monkeypatch):
+    client = make_client()
+    send = client._send_request
+
+    def slow_send(endpoint, data=None):
+        time.sleep(0.1)
+        return send(endpoint, data)
+
+    monkeypatch.setattr(client, '_send_request', slow_send)
+    results = []
+    threads = [
+        threading.Thread(target=lambda: results.append(client.get_domain_keywords('nage.dk')))
+        for _ in range(4)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len(client.sent) == 1
+    assert all(result is results[0] for result in results)
+
+
+def test_reused_responses_are_logged_at_zero_cost():
+    client = make_client()
+    run_id = client.new_run()
+    with client.cost_run(run_id):
+        client.get_domain_keywords('nage.dk')
+        client.get_domain_keywords('nage.dk')
+
+    assert [(entry['cost'], entry['reused']) for entry in client.cost_entries(run_id)] == [(0.01, False), (0, True)]
+
+
+def test_failed_responses_are_not_memoized():
+    client = make_client()
+    client.failing.add('nage.dk')
+    client.get_domain_keywords('nage.dk')
+    client.get_domain_keywords('nage.dk')
+
+    assert len(client.sent) == 2
+
+
+def test_expired_responses_are_evicted_on_insert(monkeypatch):
+    client = make_client()
+    client.get_domain_keywords('nage.dk')
+    expired_at = time.time() + Config.REQUEST_MEMO_TTL
+    monkeypatch.setattr(time, 'time', lambda: expired_at)
+    client.get_domain_keywords('nygart.dk')
+
+    assert len(client._responses) == 1
+    assert 'nygart.dk' in next(iter(client._responses))[1]
+
+
+def test_memo_is_bounded(monkeypatch):
+    monkeypatch.setattr(Config, 'REQUEST_MEMO_MAX_ENTRIES', 2)
+    client = make_client()
+    for offset in range(3):
+        client.get_domain_keywords('nage.dk', offset=offset)
+
+    assert len(client._responses) == 2
+    client.get_domain_keywords('nage.dk', offset=0)
+    assert len(client.sent) == 4
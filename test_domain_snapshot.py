@@ -0,0 +1,77 @@
+import math
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from conftest import kw_item
+from domain_snapshot import DomainSnapshot, keyword_key_hash, write_snapshot
+
+
+def test_snapshot_round_trip(tmp_path):
+    path = str(tmp_path / 'nage.dk.snap')
+    raw_data = [{'total_count': 3, 'items': [
+        kw_item('Botox-Pris', 2, search_volume=100, competition=0.1, cpc=12.34, url='https://nage.dk/botox'),
+        kw_item('filler læber', 1, search_volume=None, competition=None, cpc=None),
+        {'keyword_data': {}}
+    ]}]
+
+    assert write_snapshot(path, 'nage.dk', 1700000000.0, raw_data) == 2
+    snapshot = DomainSnapshot(path)
+
+    assert (snapshot.domain, snapshot.fetched_at, snapshot.total_count, snapshot.rows) == ('nage.dk', 1700000000.0, 3, 2)
+    assert [snapshot.keyword(row) for row in range(snapshot.rows)] == ['Botox-Pris', 'filler læber']
+    assert snapshot.string(snapshot.url_id[0]) == 'https://nage.dk/botox'
+    assert snapshot.key_hash[0] == keyword_key_hash('botox pris')
+    assert snapshot.rank.tolist() == [2, 1]
+    assert snapshot.search_volume.tolist() == [100, -1]
+    # Floats come back exactly as the API sent them
+    assert snapshot.competition[0].item() == 0.1
+    assert snapshot.cpc[0].item() == 12.34
+    assert math.isnan(snapshot.cpc[1])
+    snapshot.close()
+
+
+def test_snapshot_gaps_match_json_gaps(analyzer):
+    results = analyzer.analyze_content_gap()
+
+    assert analyzer.snapshot_gaps() == results['content_gaps']
+
+
+def test_snapshot_gaps_keep_exact_values_and_variants(analyzer, client):
+    client.data['nage.dk'] = [
+        kw_item('filler læber', 1, search_volume=600, competition=0.123456, cpc=12.345, url='https://nage.dk/a'),
+        kw_item('filler læber', 3, search_volume=100, url='https://nage.dk/b'),
+        kw_item('Filler-Læber', 5, search_volume=50),
+        kw_item('botox læber', 2, search_volume=300, competition=None, cpc=None)
+    ]
+    results = analyzer.analyze_content_gap()
+
+    gaps = analyzer.snapshot_gaps()
+
+    assert gaps == results['content_gaps']
+    filler = next(gap for gap in gaps['nage.dk'] if gap['keyword'] == 'filler læber')
+    assert (filler['competition'], filler['cpc'], filler['variants']) == (0.123456, 12.345, ['Filler-Læber'])
+    botox = next(gap for gap in gaps['nage.dk'] if gap['keyword'] == 'botox læber')
+    assert (botox['competition'], botox['cpc']) == (None, None)
+
+
+def test_concurrent_writers_of_one_snapshot(tmp_path):
+    path = str(tmp_path / 'nage.dk.snap')
+    raw_data = [{'total_count': 1, 'items': [kw_item('botox pris', 2)]}]
+
+    with ThreadPoolExecutor(max_workers=4) as executor:
+        list(executor.map(lambda _: write_snapshot(path, 'nage.dk', 1.0, raw_data), range(20)))
+
+    assert DomainSnapshot(path).keyword(0) == 'botox pris'
+    assert os.listdir(tmp_path) == ['nage.dk.snap']
+
+
+def test_budget_order_and_estimate_read_snapshots(analyzer, monkeypatch):
+    analyzer.analyze_content_gap()
+    analyzer.raw_cache.clear()
+    analyzer.budget = 1.0
+    monkeypatch.setattr(analyzer, '_load_raw_data', lambda domain: pytest.fail(f"parsed JSON for {domain}"))
+
+    assert analyzer._fetch_order(['nygart.dk', 'nage.dk']) == ['nage.dk', 'nygart.dk']
+    assert analyzer._estimate_domain('nage.dk')['items'] == 5
@@ -0,0 +1,55 @@
+import gzip
+import json
+import os
+
+import pandas as pd
+
+from config import Config
+
+
+def read_table(output_dir, file_entry, file_format):
+    path = os.path.join(output_dir, file_entry['path'])
+    if file_format == 'parquet':
+        return pd.read_parquet(path)
+    with gzip.open(path, 'rt', encoding='utf-8') as f:
+        return pd.read_csv(f)
+
+
+def test_dataset_manifest_and_partitions(analyzer):
+    results = analyzer.analyze_content_gap()
+
+    manifest = analyzer.export_dataset(results, 'dataset')
+
+    with open(os.path.join('dataset', 'manifest.json'), encoding='utf-8') as f:
+        assert json.load(f) == manifest
+    assert manifest['target_domain'] == 'cosmolaser.dk'
+    gaps = manifest['tables']['content_gaps']
+    assert gaps['partition_by'] == 'competitor'
+    assert {entry['competitor'] for entry in gaps['files']} == set(results['content_gaps'])
+    for entry in gaps['files']:
+        assert entry['path'] == os.path.join('content_gaps', f"competitor={entry['competitor']}", f"part-0.{manifest['format']}")
+        table = read_table('dataset', entry, manifest['format'])
+        assert len(table) == entry['rows'] == len(results['content_gaps'][entry['competitor']])
+        assert list(table.columns) == gaps['columns']
+    assert manifest['tables']['target_keywords']['partition_by'] is None
+
+
+def test_dataset_export_drops_removed_competitors(analyzer):
+    analyzer.export_dataset(analyzer.analyze_content_gap(), 'dataset')
+    analyzer.competitors = ['nage.dk']
+
+    analyzer.export_dataset(analyzer.analyze_content_gap(), 'dataset')
+
+    assert os.listdir(os.path.join('dataset', 'content_gaps')) == ['competitor=nage.dk']
+
+
+def test_summary_workbook_holds_only_aggregates_and_top_gaps(analyzer, monkeypatch):
+    monkeypatch.setattr(Config, 'SUMMARY_TOP_ROWS', 1)
+    results = analyzer.analyze_content_gap()
+
+    analyzer.export_to_excel(results, 'summary.xlsx', summary_only=True)
+
+    sheets = pd.read_excel('summary.xlsx', sheet_name=None)
+    assert 'Content_Gaps' not in sheets and 'Target_Keywords' not in sheets
+    assert len(sheets['Top_Content_Gaps']) == 1
+    assert 'Category_Summary' in sheets
@@ -0,0 +1,82 @@
+import sqlite3
+import time
+
+from config import Config
+from conftest import kw_item
+from history_store import HistoryStore
+
+
+def recorded_domains(db_path):
+    with sqlite3.connect(db_path) as conn:
+        return sorted(row[0] for row in conn.execute("SELECT domain FROM runs"))
+
+
+def test_only_domains_fetched_by_the_run_are_recorded(analyzer):
+    analyzer.record_history = True
+    analyzer.raw_cache['nygart.dk'] = (time.time() - 60, [{'items': [kw_item('filler læber', 3)]}])
+
+    analyzer.analyze_content_gap()
+
+    assert recorded_domains(Config.HISTORY_DB) == ['cosmolaser.dk', 'nage.dk']
+
+
+def rankings(*rows):
+    return [{'items': [kw_item(keyword, rank, search_volume=volume) for keyword, rank, volume in rows]}]
+
+
+def test_gaps_as_of_matches_spelling_variants(tmp_path):
+    store = HistoryStore(str(tmp_path / 'history.sqlite'))
+    store.record_domain('cosmolaser.dk', rankings(('Botox-Pris', 5, 100)), '2026-01-01')
+    store.record_domain('nage.dk', rankings(
+        ('botox pris', 2, 100), ('filler læber', 1, 600), ('filler  læber', 4, 50)
+    ), '2026-01-01')
+
+    gaps = store.gaps_as_of('cosmolaser.dk', '2026-01-31')
+
+    assert gaps[['keyword', 'domain', 'rank']].values.tolist() == [['filler læber', 'nage.dk', 1]]
+    store.close()
+
+
+def test_gaps_as_of_uses_latest_run_per_domain(tmp_path):
+    store = HistoryStore(str(tmp_path / 'history.sqlite'))
+    store.record_domain('cosmolaser.dk', rankings(('botox pris', 5, 100)), '2026-01-01')
+    store.record_domain('nage.dk', rankings(('filler læber', 1, 600)), '2026-01-01')
+    store.record_domain('cosmolaser.dk', rankings(('botox pris', 5, 100), ('Filler-læber', 8, 600)), '2026-02-01')
+    store.record_domain('nage.dk', rankings(('filler læber', 1, 600), ('laser haarfjerning', 2, 100)), '2026-02-01')
+
+    changes = store.gap_changes('cosmolaser.dk', '2026-01-15', '2026-02-15')
+
+    assert sorted(changes[['keyword', 'change']].values.tolist()) == [
+        ['filler læber', 'closed'], ['laser haarfjerning', 'opened']
+    ]
+    assert store.keyword_trajectory('laser hårfjerning')['rank'].tolist() == [2]
+    store.close()
+
+
+def test_domain_share_counts_top_ranked_volume(tmp_path):
+    store = HistoryStore(str(tmp_path / 'history.sqlite'))
+    store.record_domain('cosmolaser.dk', rankings(('botox pris', 5, 100), ('bil', 30, 900)), '2026-01-01')
+    store.record_domain('nage.dk', rankings(('filler læber', 1, 300)), '2026-01-01')
+
+    share = store.domain_share()
+
+    assert share[['domain', 'visible_volume', 'share']].values.tolist() == [['nage.dk', 300, 0.75], ['cosmolaser.dk', 100, 0.25]]
+    store.close()
+
+
+def test_old_databases_get_the_normalized_key(tmp_path):
+    db_path = str(tmp_path / 'history.sqlite')
+    with sqlite3.connect(db_path) as conn:
+        conn.executescript("""
+            CREATE TABLE runs (domain TEXT NOT NULL, run_date TEXT NOT NULL, keyword_count INTEGER NOT NULL,
+                               PRIMARY KEY (domain, run_date)) WITHOUT ROWID;
+            CREATE TABLE rankings (domain TEXT NOT NULL, keyword TEXT NOT NULL, run_date TEXT NOT NULL,
+                                   rank INTEGER, url TEXT, search_volume INTEGER, cpc REAL,
+                                   PRIMARY KEY (domain, run_date, keyword)) WITHOUT ROWID;
+            INSERT INTO rankings VALUES ('nage.dk', 'Botox-Pris', '2026-01-01', 2, NULL, 100, NULL);
+        """)
+
+    store = HistoryStore(db_path)
+
+    assert store.conn.execute("SELECT keyword_key FROM rankings").fetchall() == [('botox pris',)]
+    store.close()
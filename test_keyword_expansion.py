@@ -0,0 +1,64 @@
+import time
+
+from config import Config
+from keyword_expansion import KEYWORD_IDEAS_SOURCE, KeywordExpander
+
+
+def idea(keyword, search_volume=100):
+    return {'keyword': keyword, 'keyword_info': {'search_volume': search_volume, 'competition': 0.1, 'cpc': 1.0}}
+
+
+def test_seeds_are_batched_at_the_seed_limit(analyzer, client, monkeypatch):
+    monkeypatch.setattr(Config, 'KEYWORD_IDEAS_SEED_LIMIT', 2)
+    expander = KeywordExpander(analyzer)
+
+    expander.get_ideas(['botox', 'filler', 'Botox', 'laser', 'peeling', 'rosacea'])
+
+    assert client.idea_batches == [['botox', 'filler'], ['laser', 'peeling'], ['rosacea']]
+
+
+def test_ideas_are_deduped_and_tagged(analyzer, client):
+    analyzer.filter_keywords = False
+    client.ideas['botox'] = [
+        idea('Botox-Pris'), idea('random ting'), idea('filler læber'), idea('botox læber', 900), idea('botox læber')
+    ]
+    results = analyzer.analyze_content_gap()
+
+    KeywordExpander(analyzer).expand(results, ['botox'])
+
+    # The target ranks for botox pris and random ting; nage.dk already has filler læber as a gap
+    idea_gaps = results['content_gaps'][KEYWORD_IDEAS_SOURCE]
+    assert [(gap['keyword'], gap['search_volume'], gap['source']) for gap in idea_gaps] == [
+        ('botox læber', 900, KEYWORD_IDEAS_SOURCE)
+    ]
+
+
+def test_cached_seeds_are_reused_until_they_expire(analyzer, client, monkeypatch):
+    client.ideas['botox'] = [idea('botox læber')]
+    assert KeywordExpander(analyzer).get_ideas(['botox']) == [idea('botox læber')]
+    client.clear_responses()
+
+    # A new expander reads the seed from the cache file instead of calling the API
+    assert KeywordExpander(analyzer).get_ideas(['botox']) == [idea('botox læber')]
+    assert client.idea_batches == [['botox']]
+
+    expired_at = time.time() + Config.KEYWORD_IDEAS_CACHE_TTL
+    monkeypatch.setattr(time, 'time', lambda: expired_at)
+    expander = KeywordExpander(analyzer)
+    expander.get_ideas(['botox'])
+
+    assert client.idea_batches == [['botox'], ['botox']]
+    assert list(expander.cache['batches']) == ['2']
+
+
+def test_analysis_expands_the_seeds_it_priced(analyzer, client, monkeypatch):
+    client.ideas['filler læber'] = [idea('læbefiller pris')]
+    analyzer.keyword_expansion = 'gaps'
+    selected = []
+    select_seeds = KeywordExpander.select_seeds
+    monkeypatch.setattr(KeywordExpander, 'select_seeds', lambda self, *args: selected.append(args) or select_seeds(self, *args))
+
+    results = analyzer.analyze_content_gap()
+
+    assert len(selected) == 1
+    assert [gap['keyword'] for gap in results['content_gaps'][KEYWORD_IDEAS_SOURCE]] == ['læbefiller pris']
@@ -0,0 +1,31 @@
+from content_gap_analyzer import canonical_domain, canonical_domains
+from keyword_normalization import normalize_keyword
+
+
+def test_normalize_keyword_merges_spelling_variants():
+    assert normalize_keyword('Botox-Pris') == 'botox pris'
+    assert normalize_keyword('  botox   pris? ') == 'botox pris'
+    assert normalize_keyword('laser haarfjerning') == normalize_keyword('Laser hårfjerning')
+    assert normalize_keyword('filler_læber') == 'filler læber'
+    assert normalize_keyword(None) == ''
+
+
+def test_canonical_domain_strips_scheme_www_port_and_path():
+    assert canonical_domain('https://www.Nage.dk:443/behandlinger?x=1') == 'nage.dk'
+    assert canonical_domain('user@nygart.dk.') == 'nygart.dk'
+    assert canonical_domain('  ') == ''
+    assert canonical_domains(['nage.dk', 'http://www.nage.dk/', '', 'nygart.dk']) == ['nage.dk', 'nygart.dk']
+
+
+def test_content_gaps_merge_keyword_variants(analyzer):
+    target = analyzer._get_domain_keywords('cosmolaser.dk')
+    competitors = {'nage.dk': analyzer._get_domain_keywords('nage.dk')}
+
+    gaps = analyzer._find_content_gaps(target, competitors)['nage.dk']
+
+    # Botox-Pris and laser haarfjerning match the target's variants; the two filler spellings are one gap
+    assert [gap['keyword'] for gap in gaps if 'filler' in gap['keyword']] == ['filler læber']
+    filler = next(gap for gap in gaps if gap['keyword'] == 'filler læber')
+    assert filler['search_volume'] == 600
+    assert filler['variants'] == ['filler  læber']
+    assert not any(normalize_keyword(gap['keyword']) in ('botox pris', 'laser hårfjerning') for gap in gaps)
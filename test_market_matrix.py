@@ -0,0 +1,36 @@
+from config import Config
+from market_matrix import MarketMatrix
+
+
+def test_matrix_spend_is_reported_per_market(analyzer, client):
+    results_by_market = MarketMatrix(analyzer, markets=['dk', 'se']).run()
+
+    assert len(client.sent) == 6
+    for market, results in results_by_market.items():
+        report = results['run_report']
+        assert report['total_cost'] == 0.03
+        assert {entry['location_code'] for entry in report['requests']} == {Config.MARKETS[market]['location_code']}
+
+
+def test_matrix_respects_the_budget(analyzer, client, monkeypatch):
+    monkeypatch.setattr(Config, 'COST_PER_ITEM', 0)
+    analyzer.budget = 0.001
+
+    results_by_market = MarketMatrix(analyzer, markets=['dk', 'se']).run()
+
+    assert client.sent == []
+    for results in results_by_market.values():
+        assert results['run_report']['total_cost'] == 0
+        assert results['run_report']['skipped'] == ['cosmolaser.dk', 'nage.dk', 'nygart.dk']
+        assert results['content_gaps'] == {}
+
+
+def test_matrix_budget_keeps_targets_and_most_valuable_competitors(analyzer, client, monkeypatch):
+    monkeypatch.setattr(Config, 'COST_PER_ITEM', 0)
+    analyzer.budget = 0.035
+
+    results_by_market = MarketMatrix(analyzer, markets=['dk', 'se']).run()
+
+    assert sorted(target for target, _, _ in client.sent) == ['cosmolaser.dk', 'cosmolaser.dk', 'nage.dk']
+    spent = sum(results['run_report']['total_cost'] for results in results_by_market.values())
+    assert spent <= analyzer.budget
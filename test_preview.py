@@ -0,0 +1,83 @@
+import time
+
+from config import Config
+
+
+def test_preview_upgrades_to_the_full_analysis(analyzer, client):
+    results, future = analyzer.analyze_preview()
+    future.result()
+
+    assert results['preview'] is False
+    assert results['content_gaps'] == analyzer.analyze_content_gap()['content_gaps']
+    # The preview slice was the first page, so no domain was requested from offset 0 twice
+    first_pages = [target for target, offset, _ in client.sent if offset == 0]
+    assert sorted(first_pages) == sorted(set(first_pages))
+
+
+def test_full_fetches_use_the_preview_order(analyzer):
+    analyzer.analyze_content_gap()
+
+    volumes = [kw['keyword_data']['keyword_info']['search_volume'] for kw in analyzer.raw_cache['nage.dk'][1][0]['items']]
+    assert volumes == sorted(volumes, reverse=True)
+
+
+def test_failed_target_preview_reports_no_gaps(analyzer, client, monkeypatch):
+    monkeypatch.setattr(analyzer, '_complete_preview', lambda results, run_id: results)
+    client.failing.add('cosmolaser.dk')
+
+    results, _ = analyzer.analyze_preview()
+
+    assert results['content_gaps'] == {}
+    assert results['competitor_data']['nage.dk']
+
+
+def test_expired_preview_page_is_refetched(analyzer, client):
+    stale_slice = [{'total_count': 5, 'items': []}]
+    analyzer.preview_pages['nage.dk'] = (time.time() - Config.PREVIEW_PAGE_TTL, stale_slice)
+
+    raw_data = analyzer._get_raw_domain_keywords('nage.dk')
+
+    assert client.sent == [('nage.dk', 0, Config.RANKED_KEYWORDS_LIMIT)]
+    assert len(raw_data[0]['items']) == 5
+    assert 'nage.dk' not in analyzer.preview_pages
+
+
+def test_preview_respects_the_budget(analyzer, client, monkeypatch):
+    monkeypatch.setattr(analyzer, '_complete_preview', lambda results, run_id: results)
+    monkeypatch.setattr(Config, 'COST_PER_REQUEST', 0.01)
+    monkeypatch.setattr(Config, 'COST_PER_ITEM', 0)
+    analyzer.budget = 0.025
+
+    results, _ = analyzer.analyze_preview()
+
+    assert sorted(target for target, _, _ in client.sent) == ['cosmolaser.dk', 'nage.dk']
+    assert list(results['competitor_data']) == ['nage.dk']
+
+
+def test_preview_budget_skipping_the_target_gives_no_gaps(analyzer, client, monkeypatch):
+    monkeypatch.setattr(analyzer, '_complete_preview', lambda results, run_id: results)
+    analyzer.budget = 0.001
+
+    results, _ = analyzer.analyze_preview()
+
+    assert client.sent == []
+    assert results['target_missing'] and results['content_gaps'] == {}
+
+
+def test_upgrade_never_empties_the_shared_results(analyzer, monkeypatch):
+    seen = []
+
+    class Watched(dict):
+        def clear(self):
+            seen.append(len(self))
+            super().clear()
+
+        def pop(self, key, *default):
+            seen.append(len(self))
+            return super().pop(key, *default)
+
+    results = Watched(content_gaps={}, stale=True, preview=True)
+    analyzer._complete_preview(results, analyzer.client.new_run())
+
+    assert 'stale' not in results and results['preview'] is False
+    assert all(size > 1 for size in seen)
@@ -0,0 +1,63 @@
+import pytest
+
+from conftest import kw_item
+
+# Band boundaries on both sides, paired so every band of each scale is hit once
+VOLUMES = [0, 5, 9, 10, 49, 50, 99, 100, 499, 500, 5000]
+COMPETITIONS = [1.0, 0.8, 0.79, 0.6, 0.59, 0.4, 0.39, 0.2, 0.19, 0.1, 0]
+
+
+def rank_results(target_items, competitor_items):
+    return {
+        'target_keywords': [{'items': target_items}],
+        'competitor_data': {'nage.dk': [{'items': competitor_items}]}
+    }
+
+
+def scalar_bands(analyzer, volume, competition):
+    """Volume and competition band scores as _calculate_priority_score assigns them"""
+    volume_score = analyzer._calculate_priority_score(volume, 1.0)[0] / 0.5
+    comp_score = analyzer._calculate_priority_score(0, competition)[0] / 0.4
+    return volume_score, comp_score
+
+
+@pytest.mark.parametrize('volume, competition', list(zip(VOLUMES, COMPETITIONS)))
+def test_striking_score_uses_priority_score_bands(analyzer, volume, competition):
+    results = rank_results(
+        [kw_item('botox pris', 11, search_volume=volume, competition=competition)],
+        [kw_item('botox pris', 1, search_volume=volume, competition=competition)]
+    )
+    volume_score, comp_score = scalar_bands(analyzer, volume, competition)
+
+    row = analyzer.rank_gaps(results).iloc[0]
+
+    # Rank 11 is the closest striking distance rank, so proximity scores the full 5
+    assert row['Striking_Score'] == pytest.approx(round(volume_score * 0.5 + 5 * 0.3 + comp_score * 0.2, 2))
+    assert row['Striking_Priority'] == analyzer._priority_level(row['Striking_Score'])
+
+
+def test_rank_gaps_keeps_striking_distance_and_top_competitors(analyzer):
+    results = rank_results(
+        [
+            kw_item('botox pris', 12, search_volume=500),
+            kw_item('Filler-Læber', 30, search_volume=500),
+            kw_item('laser hårfjerning', 5, search_volume=500),
+            kw_item('åreknuder', 31, search_volume=500),
+            kw_item('karsprængninger', 15, search_volume=500)
+        ],
+        [
+            kw_item('botox pris', 2),
+            kw_item('filler læber', 3),
+            kw_item('laser hårfjerning', 1),
+            kw_item('åreknuder', 1),
+            kw_item('karsprængninger', 4)
+        ]
+    )
+
+    ranked = analyzer.rank_gaps(results)
+
+    assert ranked[['Keyword', 'Target_Rank', 'Competitor_Rank', 'Rank_Delta']].values.tolist() == [
+        ['botox pris', 12, 2, 10], ['Filler-Læber', 30, 3, 27]
+    ]
+    # Closer to page one scores higher at equal volume and competition
+    assert ranked['Striking_Score'].is_monotonic_decreasing
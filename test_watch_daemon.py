@@ -0,0 +1,51 @@
+import json
+
+from conftest import kw_item
+from watch_daemon import WatchDaemon
+
+
+def make_daemon(analyzer, tmp_path):
+    daemon = WatchDaemon(
+        analyzer, state_file=str(tmp_path / 'state.json'), notify_file=str(tmp_path / 'notify.jsonl'),
+        retry_delay=60
+    )
+    daemon._restore_domains()
+    return daemon
+
+
+def notifications(tmp_path):
+    path = tmp_path / 'notify.jsonl'
+    if not path.exists():
+        return []
+    return [json.loads(line) for line in path.read_text(encoding='utf-8').splitlines()]
+
+
+def test_failed_target_refresh_keeps_previous_data(analyzer, client, tmp_path):
+    daemon = make_daemon(analyzer, tmp_path)
+    for domain in daemon.domains:
+        assert daemon.refresh(domain)
+    known = list(daemon.state['known_high_gaps'])
+    previous = analyzer.raw_cache['cosmolaser.dk']
+
+    client.failing.add('cosmolaser.dk')
+    analyzer.client.clear_responses()
+    assert not daemon.refresh('cosmolaser.dk')
+
+    assert analyzer.raw_cache['cosmolaser.dk'] is previous
+    assert daemon.filtered['cosmolaser.dk']
+    assert daemon.state['known_high_gaps'] == known
+    assert notifications(tmp_path) == []
+
+
+def test_new_high_priority_gap_is_notified_once(analyzer, client, tmp_path):
+    daemon = make_daemon(analyzer, tmp_path)
+    for domain in daemon.domains:
+        daemon.refresh(domain)
+    assert daemon.state['baselined']
+
+    client.data['nage.dk'].append(kw_item('botox læber', 1, search_volume=900, competition=0.05))
+    analyzer.client.clear_responses()
+    daemon.refresh('nage.dk')
+    daemon.refresh('nage.dk')
+
+    assert [event['keyword'] for event in notifications(tmp_path)] == ['botox læber']
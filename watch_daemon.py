@@ -0,0 +1,214 @@
+#!/usr/bin/env python3
+
+import argparse
+import heapq
+import json
+import os
+import random
+import signal
+import threading
+import time
+from datetime import datetime
+
+import requests
+
+from content_gap_analyzer import ContentGapAnalyzer, canonical_domains
+from history_store import HistoryStore
+from config import Config
+
+
+class WatchDaemon:
+    """Refreshes each domain on its own jittered schedule and reports new high-priority gaps"""
+
+    def __init__(self, analyzer=None, interval=Config.WATCH_REFRESH_INTERVAL, jitter=Config.WATCH_JITTER,
+                 state_file=Config.WATCH_STATE_FILE, notify_file=Config.WATCH_NOTIFY_FILE, webhook_url=None,
+                 retry_delay=Config.WATCH_RETRY_DELAY):
+        self.analyzer = analyzer or ContentGapAnalyzer()
+        self.interval = interval
+        self.retry_delay = retry_delay
+        self.jitter = jitter
+        self.state_file = state_file
+        self.notify_file = notify_file
+        self.webhook_url = webhook_url
+        self.stop_event = threading.Event()
+
+        self.domains = canonical_domains([self.analyzer.target_domain, *self.analyzer.competitors])
+        self.filtered = {}  # domain -> filtered keyword data from the latest refresh
+        self.gaps = {}  # competitor -> current gap list
+        self.state = self._load_state()
+
+    def run(self):
+        """Run until stopped, refreshing whichever domain is due next"""
+        self._restore_domains()
+        schedule = [(self.state['domains'][domain]['next_refresh'], domain) for domain in self.domains]
+        heapq.heapify(schedule)
+        print(f"Overvåger {len(self.domains)} domæner (interval {self.interval / 3600:.1f} timer)")
+
+        while not self.stop_event.is_set():
+            due_at, domain = schedule[0]
+            if self.stop_event.wait(max(0, due_at - time.time())):
+                break
+
+            heapq.heappop(schedule)
+            if self.refresh(domain):
+                next_refresh = time.time() + self._jittered(self.interval)
+            else:
+                next_refresh = time.time() + self.retry_delay
+            self.state['domains'][domain]['next_refresh'] = next_refresh
+            heapq.heappush(schedule, (next_refresh, domain))
+            self._save_state()
+
+        self._save_state()
+        print("Overvågning stoppet")
+
+    def stop(self, *_):
+        self.stop_event.set()
+
+    def refresh(self, domain):
+        """Refetch one domain and recompute only the gaps it affects; returns False if the fetch failed"""
+        print(f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] Opdaterer {domain}")
+        previous = self.analyzer.raw_cache.get(domain)
+        self.analyzer.clear_cache(domain)
+        filtered = self.analyzer._get_domain_keywords(domain)
+        
+        # Successful fetches land in raw_cache; anything else is an API error, not "no keywords"
+        if domain not in self.analyzer.raw_cache:
+            if previous:
+                self.analyzer.raw_cache[domain] = previous
+            print(f"  Hentning af {domain} fejlede - prøver igen om {self.retry_delay / 60:.0f} minutter")
+            return False
+        
+        self.filtered[domain] = filtered
+        self.state['domains'][domain]['last_refresh'] = time.time()
+
+        if self.analyzer.record_history and domain in self.analyzer.raw_cache:
+            store = HistoryStore()
+            try:
+                store.record_analyzer(self.analyzer, [domain])
+            finally:
+                store.close()
+
+        target = self.domains[0]
+        affected = self.domains[1:] if domain == target else [domain]
+        self._recompute_gaps(affected)
+        return True
+
+    def _recompute_gaps(self, competitors):
+        target_data = self.filtered.get(self.domains[0], [])
+        competitor_data = {competitor: self.filtered.get(competitor, []) for competitor in competitors}
+        self.gaps.update(self.analyzer._find_content_gaps(target_data, competitor_data))
+
+        previous = set(self.state['known_high_gaps'])
+        known = set(previous)
+        baseline = not self.state['baselined']
+        for competitor in competitors:
+            # Drop the competitor's old keys so gaps that close and reopen are reported again
+            known = {key for key in known if not key.startswith(f"{competitor}|")}
+            for gap in self.gaps[competitor]:
+                scored = self.analyzer.score_gap(gap)
+                if scored['priority_level'] != 'HØJ':
+                    continue
+                key = f"{competitor}|{gap['keyword']}"
+                if key not in previous and not baseline:
+                    self._notify(competitor, scored)
+                known.add(key)
+
+        self.state['known_high_gaps'] = sorted(known)
+        if baseline and all(domain in self.filtered for domain in self.domains):
+            self.state['baselined'] = True
+
+    def _notify(self, competitor, gap):
+        """Append a notification line and post it to the webhook if configured"""
+        event = {
+            'time': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+            'type': 'new_high_priority_gap',
+            'competitor': competitor,
+            'keyword': gap['keyword'],
+            'search_volume': gap.get('search_volume'),
+            'priority_score': gap['priority_score'],
+            'competitor_url': gap.get('competitor_url')
+        }
+        print(f"  Ny HØJ prioritet gap: {gap['keyword']} ({competitor})")
+
+        try:
+            with open(self.notify_file, 'a', encoding='utf-8') as f:
+                f.write(json.dumps(event, ensure_ascii=False) + '\n')
+        except Exception as e:
+            print(f"Fejl ved skrivning af notifikation: {e}")
+
+        if self.webhook_url:
+            try:
+                requests.post(self.webhook_url, json=event, timeout=10)
+            except Exception as e:
+                print(f"Fejl ved afsendelse af webhook: {e}")
+
+    def _restore_domains(self):
+        """Schedule new domains evenly across one interval and warm stored data for the rest"""
+        now = time.time()
+        new_domains = [domain for domain in self.domains if domain not in self.state['domains']]
+        for i, domain in enumerate(new_domains):
+            offset = self.interval * i / max(len(new_domains), 1)
+            self.state['domains'][domain] = {'next_refresh': now + self._jittered(offset), 'last_refresh': None}
+
+        # Forget domains that are no longer configured
+        self.state['domains'] = {domain: self.state['domains'][domain] for domain in self.domains}
+        self.state['known_high_gaps'] = [
+            key for key in self.state['known_high_gaps'] if key.split('|', 1)[0] in self.domains
+        ]
+
+        # Domains with stored data can compute gaps now instead of waiting for their refresh
+        self.analyzer.offline = True
+        try:
+            for domain in self.domains:
+                if os.path.exists(self.analyzer._raw_data_path(domain)):
+                    self.filtered[domain] = self.analyzer._get_domain_keywords(domain)
+        finally:
+            self.analyzer.offline = False
+        if self.filtered:
+            self._recompute_gaps([domain for domain in self.domains[1:] if domain in self.filtered])
+        self._save_state()
+
+    def _jittered(self, seconds):
+        spread = self.interval * self.jitter
+        return max(0, seconds + random.uniform(-spread, spread))
+
+    def _load_state(self):
+        try:
+            if os.path.exists(self.state_file):
+                with open(self.state_file, 'r', encoding='utf-8') as f:
+                    state = json.load(f)
+                state.setdefault('domains', {})
+                state.setdefault('known_high_gaps', [])
+                state.setdefault('baselined', False)
+                return state
+        except Exception as e:
+            print(f"Fejl ved indlæsning af overvågningsstatus: {e}")
+        return {'domains': {}, 'known_high_gaps': [], 'baselined': False}
+
+    def _save_state(self):
+        # Write to a temporary file first so a crash never leaves a truncated state file
+        temp_file = f"{self.state_file}.tmp"
+        try:
+            with open(temp_file, 'w', encoding='utf-8') as f:
+                json.dump(self.state, f, ensure_ascii=False, indent=2)
+            os.replace(temp_file, self.state_file)
+        except Exception as e:
+            print(f"Fejl ved gemning af overvågningsstatus: {e}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Watch competitors and notify about new high-priority gaps")
+    parser.add_argument('--interval-hours', type=float, default=Config.WATCH_REFRESH_INTERVAL / 3600)
+    parser.add_argument('--jitter', type=float, default=Config.WATCH_JITTER,
+                        help="Random spread as a fraction of the interval")
+    parser.add_argument('--webhook', help="URL that receives a JSON POST per new high-priority gap")
+    args = parser.parse_args()
+
+    daemon = WatchDaemon(interval=args.interval_hours * 3600, jitter=args.jitter, webhook_url=args.webhook)
+    signal.signal(signal.SIGINT, daemon.stop)
+    signal.signal(signal.SIGTERM, daemon.stop)
+    daemon.run()
+
+
+if __name__ == "__main__":
+    main()